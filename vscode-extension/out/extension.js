@@ -20,6 +20,7 @@ let backend;
 let statusBar;
 let outputChannel;
 let extensionContext;
+let insertQueue = Promise.resolve();
 function activate(context) {
     return __awaiter(this, void 0, void 0, function* () {
         extensionContext = context;
@@ -45,6 +46,8 @@ function registerCommands(context) {
     }), vscode.commands.registerCommand('alpencode.stop', () => {
         backend.send('stop');
         statusBar.setProcessing();
+    }), vscode.commands.registerCommand('alpencode.cancel', () => {
+        backend.send('cancel');
     }), vscode.commands.registerCommand('alpencode.toggle', () => {
         if (statusBar.text.includes("Recording")) {
             vscode.commands.executeCommand('alpencode.stop');
@@ -62,8 +65,33 @@ function registerCommands(context) {
             title: "🎤 Calibrating... Please stay silent.",
             cancellable: false
         }, (progress) => __awaiter(this, void 0, void 0, function* () {
-            backend.send('calibrate');
-            yield new Promise(resolve => setTimeout(resolve, 4000));
+            // Wartet auf die Antwort des Backends statt auf ein festes Timeout
+            yield backend.request('calibrate').catch(e => outputChannel.appendLine(`Calibrate failed: ${e}`));
+        }));
+    }), vscode.commands.registerCommand('alpencode.stats', () => __awaiter(this, void 0, void 0, function* () {
+        // Rollende Latenzen pro Pipeline-Stufe + Modellspeicher im Output-Kanal anzeigen
+        try {
+            const stats = yield backend.request('stats');
+            outputChannel.appendLine(`Stats: ${JSON.stringify(stats, null, 2)}`);
+            outputChannel.show();
+        }
+        catch (e) {
+            outputChannel.appendLine(`Stats failed: ${e}`);
+        }
+    })), vscode.commands.registerCommand('alpencode.autotune', () => {
+        vscode.window.withProgress({
+            location: vscode.ProgressLocation.Notification,
+            title: "⚙️ AlpenCode: Tuning inference settings (a few minutes)...",
+            cancellable: false
+        }, () => __awaiter(this, void 0, void 0, function* () {
+            try {
+                const result = yield backend.request('autotune', {}, 60 * 60 * 1000);
+                outputChannel.appendLine(`Autotune: ${JSON.stringify(result, null, 2)}`);
+                vscode.window.showInformationMessage(`AlpenCode autotune: ${JSON.stringify(result.settings)} (applies after restart)`);
+            }
+            catch (e) {
+                outputChannel.appendLine(`Autotune failed: ${e}`);
+            }
         }));
     }), vscode.commands.registerCommand('alpencode.resetEnv', () => __awaiter(this, void 0, void 0, function* () {
         const choice = yield vscode.window.showWarningMessage("Delete AlpenCode Python environment? It will reinstall next time.", "Yes, Delete", "Cancel");
@@ -139,6 +167,7 @@ function registerCommands(context) {
     })));
 }
 function handleBackendMessage(msg) {
+    var _a;
     // Debugging (optional)
     if (msg.type !== 'calibration_level') {
         // outputChannel.appendLine(`Msg: ${JSON.stringify(msg)}`);
@@ -177,9 +206,18 @@ function handleBackendMessage(msg) {
         case 'status':
             outputChannel.appendLine(`Status: ${msg.message}`);
             break;
+        case 'metrics':
+            outputChannel.appendLine(`Metrics: total ${msg.stages.total} ms (queue ${msg.stages.queue_wait}, inference ${(_a = msg.stages.inference) !== null && _a !== void 0 ? _a : '-'}, write ${msg.stages.write}) for ${msg.audio_ms} ms audio`);
+            break;
+        case 'partial':
+            // Live-Hypothese anzeigen, getippt wird nur das stabile Präfix (Backend)
+            statusBar.setPartial(msg.text);
+            break;
         case 'transcription':
-            insertText(msg.text);
-            statusBar.setReady();
+            // Reihenfolge einhalten: jede Einfügung wartet auf die vorherige
+            insertQueue = insertQueue
+                .then(() => insertText(msg.text || '', !!msg.enter))
+                .catch(e => outputChannel.appendLine(`Insert failed: ${e}`));
             break;
         case 'error':
             vscode.window.showErrorMessage(`AlpenCode Error: ${msg.message}`);
@@ -246,18 +284,35 @@ function handleBackendMessage(msg) {
             break;
     }
 }
-function insertText(text) {
-    const config = vscode.workspace.getConfiguration('alpencode');
-    const autoEnter = config.get('autoEnter', false);
-    if (text && text.length > 0) {
-        const textToType = text + (autoEnter ? "" : " ");
-        backend.send(`type_text ${textToType}`);
-        if (autoEnter) {
-            setTimeout(() => {
-                backend.send('press_enter');
-            }, 100);
+function insertText(text_1) {
+    return __awaiter(this, arguments, void 0, function* (text, pressEnter = false) {
+        const config = vscode.workspace.getConfiguration('alpencode');
+        const autoEnter = config.get('autoEnter', false) && text.length > 0;
+        const enter = pressEnter || autoEnter;
+        // Editor im Fokus: ein einziges Edit, unabhängig von der Textlänge und ohne Tastatur-Kollisionen
+        const editor = vscode.window.activeTextEditor;
+        if (editor && vscode.window.state.focused && text.length > 0) {
+            const ok = yield editor.edit(edit => {
+                for (const selection of editor.selections) {
+                    edit.replace(selection, text);
+                }
+            });
+            if (ok) {
+                // Enter als echter Tastendruck nach dem Edit, nie als "\n" im Dokument
+                if (enter) {
+                    yield backend.request('press_enter').catch(e => outputChannel.appendLine(`Enter failed: ${e}`));
+                }
+                return;
+            }
         }
-    }
+        // Fallback (Terminal, Chat, andere Apps): Backend tippt
+        if (text.length > 0) {
+            yield backend.request('type_text', { text }, 120000).catch(e => outputChannel.appendLine(`Typing failed: ${e}`));
+        }
+        if (enter) {
+            backend.send('press_enter');
+        }
+    });
 }
 function deactivate() {
     backend === null || backend === void 0 ? void 0 : backend.stop();
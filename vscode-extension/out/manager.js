@@ -1,19 +1,25 @@
 "use strict";
 Object.defineProperty(exports, "__esModule", { value: true });
 exports.PythonBackendManager = void 0;
+const vscode = require("vscode");
 const cp = require("child_process");
 const path = require("path");
 class PythonBackendManager {
     constructor(outputChannel, onMessage) {
         this.intentionalStop = false; // <--- NEU: Flag für gewollten Stopp
+        this.nextRequestId = 1;
+        this.pending = new Map();
         this.outputChannel = outputChannel;
         this.onMessageCallback = onMessage;
     }
     start(pythonPath, extensionPath) {
+        var _a, _b, _c;
         this.intentionalStop = false; // <--- Reset beim Start
         const scriptPath = path.join(extensionPath, 'python', 'main.py');
         this.outputChannel.appendLine(`Starting Backend: ${pythonPath} ${scriptPath}`);
-        const env = Object.assign(Object.assign({}, process.env), { PYTHONUNBUFFERED: '1', PYTHONIOENCODING: 'utf-8' });
+        // Erster Workspace-Ordner: dort sucht das Backend .alpencode/vocabulary.json
+        const workspace = (_c = (_b = (_a = vscode.workspace.workspaceFolders) === null || _a === void 0 ? void 0 : _a[0]) === null || _b === void 0 ? void 0 : _b.uri.fsPath) !== null && _c !== void 0 ? _c : '';
+        const env = Object.assign(Object.assign({}, process.env), { PYTHONUNBUFFERED: '1', PYTHONIOENCODING: 'utf-8', ALPENCODE_WORKSPACE: workspace });
         try {
             this.process = cp.spawn(pythonPath, [scriptPath], {
                 env,
@@ -28,6 +34,10 @@ class PythonBackendManager {
                             continue;
                         try {
                             const msg = JSON.parse(line);
+                            if (msg.type === 'response') {
+                                this.resolveRequest(msg);
+                                continue;
+                            }
                             this.onMessageCallback(msg);
                         }
                         catch (e) {
@@ -49,6 +59,8 @@ class PythonBackendManager {
                     return; // KEINE Fehlermeldung an UI senden
                 }
                 this.outputChannel.appendLine(`Python backend exited with code ${code}`);
+                this.pending.forEach(entry => { clearTimeout(entry.timer); entry.reject(new Error('Backend exited')); });
+                this.pending.clear();
                 try {
                     this.onMessageCallback({ type: 'backend_exited', code });
                 }
@@ -81,6 +93,36 @@ class PythonBackendManager {
             }
         }
     }
+    // Framed Request mit ID (Protokoll v1), die Antwort kommt als {"type": "response", "id": ...}
+    // Ohne Antwort nach timeoutMs wird abgelehnt, damit Fortschrittsanzeigen nie hängen bleiben
+    request(method, params = {}, timeoutMs = 30000) {
+        if (!this.isRunning()) {
+            return Promise.reject(new Error('Backend not running'));
+        }
+        const id = this.nextRequestId++;
+        return new Promise((resolve, reject) => {
+            const timer = setTimeout(() => {
+                if (this.pending.delete(id)) {
+                    reject(new Error(`Request '${method}' timed out after ${timeoutMs} ms`));
+                }
+            }, timeoutMs);
+            this.pending.set(id, { resolve, reject, timer });
+            this.send(JSON.stringify({ v: 1, id, method, params }));
+        });
+    }
+    resolveRequest(msg) {
+        const entry = this.pending.get(msg.id);
+        if (!entry)
+            return;
+        this.pending.delete(msg.id);
+        clearTimeout(entry.timer);
+        if (msg.error !== undefined) {
+            entry.reject(new Error(msg.error));
+        }
+        else {
+            entry.resolve(msg.result);
+        }
+    }
     isRunning() {
         return this.process !== undefined && !this.process.killed;
     }
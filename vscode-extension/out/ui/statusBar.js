@@ -18,6 +18,11 @@ class StatusBarManager {
         this.item.text = "$(record) Recording...";
         this.item.backgroundColor = new vscode.ThemeColor('statusBarItem.errorBackground');
     }
+    setPartial(text) {
+        const snippet = text.length > 40 ? '…' + text.slice(-40) : text;
+        this.item.text = `$(record) Recording... ${snippet}`;
+        this.item.tooltip = text;
+    }
     setProcessing() {
         this.item.text = "$(sync~spin) Processing...";
         this.item.backgroundColor = undefined;
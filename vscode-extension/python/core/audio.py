@@ -1,12 +1,14 @@
 import pyaudio
 import numpy as np
 import threading
-import json
-import sys
 import queue
 import time
 from ctypes import *
 from contextlib import contextmanager
+from core.vad import create_vad
+from core.ringbuffer import AudioRingBuffer
+from core.metrics import now
+from core.protocol import send_json
 
 # --- LINUX ALSA ERROR SUPPRESSION ---
 # Dies verhindert, dass C-Level Warnungen (JACK/ALSA) den Prozess crashen
@@ -28,27 +30,51 @@ def no_alsa_error():
         yield
 # ------------------------------------
 
+class AudioSegment:
+    """Queue-Eintrag der AudioEngine: int16 Audio plus Art des Segments.
+
+    held=True: fertiges Teilstück einer noch gehaltenen push-to-talk Aufnahme,
+    wird vorab dekodiert, der Text aber erst beim Loslassen ausgegeben.
+    """
+    __slots__ = ("audio", "partial", "held", "captured_at")
+
+    def __init__(self, audio, partial=False, held=False):
+        self.audio = audio
+        self.partial = partial
+        self.held = held
+        self.captured_at = now()  # Ende der Aufnahme des Segments (Start der Latenzmessung)
+
+    def __len__(self):
+        return len(self.audio)
+
+
 class AudioEngine:
     RATE = 16000  # Whisper arbeitet meist besser mit 16k, 48k geht aber auch (wird resampled)
-    CHUNK = 4096
+    CHUNK = 1024  # 64 ms pro Read, der VAD entscheidet intern auf 20 ms Frames
+    MONITOR_CHUNK = 4096
     MAX_DURATION = 60 
+    PRE_ROLL_SAMPLES = 15 * 4096
+    PARTIAL_MAX_SAMPLES = 30 * RATE  # längere Fenster nicht mehr live dekodieren (Whisper Kontext = 30 s)
+    PREDECODE_MIN_SAMPLES = 2 * RATE  # kürzere Teilstücke nicht abschneiden (zu wenig Kontext für Whisper)
 
     def __init__(self):
         self.p = None 
         self.stream = None
-        self.frames = []
+        # Platz für zwei volle Segmente, damit beim Umlauf nie ein offenes Segment verloren geht
+        self.buffer = AudioRingBuffer(2 * (self.RATE * self.MAX_DURATION + self.CHUNK))
         self.recording = False
         self.monitoring = False
         self.lock = threading.Lock()
         self.audio_queue = queue.Queue()
-        
-        self.silence_counter = 0
-        self.auto_stop_counter = 0
+        self.vad = create_vad()
         
         self.speech_detected = False
         self.streaming_mode = False
-        self.cut_pause_chunks = 0
-        self.stop_pause_chunks = 0
+        self.cut_pause_ms = 0
+        self.stop_pause_ms = 0
+        self.partial_interval_ms = 0
+        self.predecode_pause_ms = 0
+        self._next_partial = 0
 
     def _ensure_pyaudio(self):
         if self.p is None: 
@@ -70,103 +96,140 @@ class AudioEngine:
         except: pass
         return devices
 
-    def start_recording(self, device_index, silence_threshold, streaming=False, stream_pause_ms=500, stop_pause_s=3.0):
+    def start_recording(self, device_index, silence_threshold, streaming=False, stream_pause_ms=500, stop_pause_s=3.0, vad_config=None, partial_interval_ms=0, predecode_pause_ms=0):
         self._ensure_pyaudio()
         self._stop_stream()
-        self.frames = []
-        self.recording = True
+        self.configure_recording(silence_threshold, streaming, stream_pause_ms, stop_pause_s, vad_config, partial_interval_ms, predecode_pause_ms)
         self.monitoring = False
         
-        self.silence_counter = 0
-        self.auto_stop_counter = 0
-        self.speech_detected = False 
-        self.streaming_mode = streaming
-        
-        chunks_per_sec = self.RATE / self.CHUNK
-        self.cut_pause_chunks = int(chunks_per_sec * (float(stream_pause_ms) / 1000.0))
-        self.stop_pause_chunks = int(chunks_per_sec * float(stop_pause_s))
+        send_json({"type": "status", "message": f"Audio Config: Thresh={silence_threshold}, VAD={type(self.vad).__name__}, AutoStop={int(self.stop_pause_ms)} ms"})
         
-        print(json.dumps({"type": "status", "message": f"Audio Config: Thresh={silence_threshold}, AutoStop={self.stop_pause_chunks} chunks"}), flush=True)
-        
-        with self.audio_queue.mutex:
-            self.audio_queue.queue.clear()
+        # Queue NICHT leeren: Segmente einer früheren Aufnahme können noch auf das Modell warten
             
         try:
-            self._start_stream(device_index, lambda: self._record_loop(silence_threshold))
+            self._start_stream(device_index, self._record_loop)
         except Exception as e:
-            print(json.dumps({"type": "error", "message": f"Mic Error: {e}"}))
-            sys.stdout.flush()
+            send_json({"type": "error", "message": f"Mic Error: {e}"})
             self.recording = False
 
+    def configure_recording(self, silence_threshold, streaming=False, stream_pause_ms=500, stop_pause_s=3.0, vad_config=None, partial_interval_ms=0, predecode_pause_ms=0):
+        # Zustand für eine neue Aufnahme, ohne Mikrofon (auch vom Benchmark genutzt)
+        self.buffer.clear()
+        self.recording = True
+        
+        self.vad = create_vad(vad_config, silence_threshold, self.RATE)
+        self.speech_detected = False 
+        self.streaming_mode = streaming
+        
+        self.cut_pause_ms = float(stream_pause_ms)
+        self.stop_pause_ms = float(stop_pause_s) * 1000.0
+        # Live-Partials nur im Streaming-Modus (0 = aus)
+        self.partial_interval_ms = float(partial_interval_ms) if streaming else 0
+        # Push-to-talk: an Pausen schneiden und vorab dekodieren, während die Taste noch gehalten wird (0 = aus)
+        self.predecode_pause_ms = float(predecode_pause_ms)
+        self._next_partial = self._partial_step()
+
     def stop_recording(self):
         was_rec = self.recording
         self.recording = False
         self._stop_stream()
         
-        if was_rec and len(self.frames) > 0 and self.speech_detected:
-            self.audio_queue.put(b''.join(self.frames))
+        if was_rec and len(self.buffer) > 0 and self.speech_detected:
+            self.audio_queue.put(AudioSegment(self.buffer.cut()))
         
-        self.frames = []
+        self.buffer.clear()
 
-    def _record_loop(self, threshold):
-        chunks_max = int((self.RATE / self.CHUNK) * self.MAX_DURATION)
-        chunks_per_sec = self.RATE / self.CHUNK
-        log_timer = 0
+    def cancel_recording(self):
+        # Aufnahme verwerfen: nichts mehr in die Queue, wartende Segmente raus
+        self.recording = False
+        self._stop_stream()
+        self.buffer.clear()
+        q = self.audio_queue
+        with q.mutex:
+            # Verworfene Items gelten als erledigt, sonst bleibt unfinished_tasks dauerhaft > 0
+            q.unfinished_tasks -= len(q.queue)
+            q.queue.clear()
+            if q.unfinished_tasks <= 0:
+                q.unfinished_tasks = 0
+                q.all_tasks_done.notify_all()
 
+    def _record_loop(self):
         while self.recording:
             with self.lock:
                 if not self.stream: break
                 try:
                     data = self.stream.read(self.CHUNK, exception_on_overflow=False)
-                    self.frames.append(data)
-                    rms = self.calculate_rms(data)
-
-                    log_timer += 1
-                    # Logge seltener (z.B. alle 0.5 Sekunden), um stdout nicht zu fluten
-                    if log_timer % int(chunks_per_sec / 2) == 0:
-                         silence_sec = self.auto_stop_counter / chunks_per_sec
-                         # Optional: Log hier auskommentieren, wenn es im VS Code Output nervt
-                         # print(json.dumps({"type": "status", "message": f"Mic Level: {rms:.2f}"}), flush=True)
-
-                    if rms > threshold:
-                        self.speech_detected = True
-                        self.silence_counter = 0     
-                        self.auto_stop_counter = 0   
-                    else:
-                        self.auto_stop_counter += 1  
-
-                        if self.speech_detected:
-                            self.silence_counter += 1 
-                        else:
-                            if len(self.frames) > 15: self.frames.pop(0)
-                            self.silence_counter = 0
-
-                    if self.streaming_mode and self.auto_stop_counter > self.stop_pause_chunks:
-                        print(json.dumps({"type": "status", "message": "🛑 AUTO-STOP (Silence)"}), flush=True)
-                        self.audio_queue.put(b''.join(self.frames))
-                        self.audio_queue.put("CMD_STOP")
-                        self.recording = False
+                    if not self.process_chunk(data):
                         break
-
-                    if self.streaming_mode and self.speech_detected and (self.silence_counter > self.cut_pause_chunks):
-                        cut_idx = len(self.frames) - int(self.cut_pause_chunks / 2)
-                        if cut_idx > 0:
-                            chunk = b''.join(self.frames[:cut_idx])
-                            self.audio_queue.put(chunk)
-                            self.frames = self.frames[cut_idx:]
-                            self.silence_counter = 0
-                            self.speech_detected = False 
-
-                    if len(self.frames) > chunks_max:
-                        self.audio_queue.put(b''.join(self.frames))
-                        self.frames = []
-                        self.speech_detected = False
-                
                 except Exception as e: 
-                    print(json.dumps({"type": "error", "message": str(e)}))
+                    send_json({"type": "error", "message": str(e)})
                     break
         self._stop_stream()
 
+    def _partial_step(self):
+        return int(self.RATE * self.partial_interval_ms / 1000.0)
+
+    def process_chunk(self, data):
+        """Segmentiert einen Chunk (VAD, Streaming-Cuts, Auto-Stop, Partials).
+
+        Gibt False zurück, wenn die Aufnahme durch Auto-Stop beendet wurde.
+        """
+        samples = self.buffer.append(data)
+        partial_step = self._partial_step()
+
+        if self.vad.process(samples):
+            self.speech_detected = True
+        elif not self.speech_detected:
+            self.buffer.keep_last(self.PRE_ROLL_SAMPLES)
+
+        # Stille seit dem letzten Sprach-Frame (Frame-genau, inkl. Hangover)
+        silence_ms = self.vad.silence_ms
+
+        if self.streaming_mode and silence_ms > self.stop_pause_ms:
+            send_json({"type": "status", "message": "🛑 AUTO-STOP (Silence)"})
+            if self.speech_detected:
+                self.audio_queue.put(AudioSegment(self.buffer.cut()))
+            self.audio_queue.put("CMD_STOP")
+            self.recording = False
+            return False
+
+        # Streaming: Segment an jeder Pause ausgeben. Push-to-talk: Teilstück vorab dekodieren (held)
+        held = not self.streaming_mode
+        pause_ms = self.predecode_pause_ms if held else self.cut_pause_ms
+        if pause_ms and self.speech_detected and silence_ms > pause_ms and (not held or len(self.buffer) >= self.PREDECODE_MIN_SAMPLES):
+            cut_keep = int(self.RATE * pause_ms / 2000.0)  # halbe Pause bleibt für das nächste Segment
+            cut_idx = len(self.buffer) - cut_keep
+            if cut_idx > 0:
+                self.audio_queue.put(AudioSegment(self.buffer.cut(cut_idx), held=held))
+                self.speech_detected = False 
+                self._next_partial = partial_step
+
+        if len(self.buffer) > self.RATE * self.MAX_DURATION:
+            self.audio_queue.put(AudioSegment(self.buffer.cut(), held=held))
+            self.speech_detected = False
+            self._next_partial = partial_step
+
+        # Live-Partial: wachsendes Fenster des offenen Segments regelmässig neu dekodieren
+        if partial_step and self.speech_detected and self._next_partial <= len(self.buffer) <= self.PARTIAL_MAX_SAMPLES:
+            self.audio_queue.put(AudioSegment(self.buffer.peek(), partial=True))
+            self._next_partial = len(self.buffer) + partial_step
+        return True
+
+    def on_config_changed(self, changed):
+        # Subscriber des ConfigManager: Änderungen ohne Neustart der Aufnahme übernehmen
+        if 'silence_threshold' in changed and self.recording:
+            self.vad.threshold = float(changed['silence_threshold'])
+        if 'stream_pause' in changed:
+            self.cut_pause_ms = float(changed['stream_pause'])
+        if 'predecode_pause_ms' in changed:
+            self.predecode_pause_ms = float(changed['predecode_pause_ms'])
+        if 'auto_stop_delay' in changed:
+            self.stop_pause_ms = float(changed['auto_stop_delay']) * 1000.0
+        if 'device_index' in changed and self.monitoring:
+            self.stop_monitoring()
+            time.sleep(0.2)
+            self.start_monitoring(changed['device_index'])
+
     def start_monitoring(self, dev_idx):
         self._ensure_pyaudio()
         if self.monitoring: self.stop_monitoring()
@@ -190,7 +253,7 @@ class AudioEngine:
                 if idx is not None:
                      self.p.get_device_info_by_index(idx)
             except:
-                print(json.dumps({"type": "status", "message": f"Device {idx} not found, using Default."}), flush=True)
+                send_json({"type": "status", "message": f"Device {idx} not found, using Default."})
                 safe_idx = None
 
             # Hier ebenfalls mit error suppression, da open() auch feuern kann
@@ -217,14 +280,14 @@ class AudioEngine:
             with self.lock:
                 if not self.stream: break
                 try:
-                    d = self.stream.read(self.CHUNK, exception_on_overflow=False)
-                    print(json.dumps({"type": "calibration_level", "value": self.calculate_rms(d)}), flush=True)
+                    d = self.stream.read(self.MONITOR_CHUNK, exception_on_overflow=False)
+                    send_json({"type": "calibration_level", "value": self.calculate_rms(d)})
                 except: break
     
     @staticmethod
     def calculate_rms(raw):
         try:
-            data = np.frombuffer(raw, dtype=np.int16)
+            data = raw if isinstance(raw, np.ndarray) else np.frombuffer(raw, dtype=np.int16)
             # Schutz gegen leere Arrays
             if len(data) == 0: return 0.0
             
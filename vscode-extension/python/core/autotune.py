@@ -0,0 +1,188 @@
+import os
+import gc
+import time
+import argparse
+import numpy as np
+from core.config import ConfigManager
+from core.transcriber import SwissTranscriber
+from core.protocol import send_json
+
+
+def synthetic_clip(seconds=5.0, rate=16000, seed=0):
+    """Sprachähnliches Testsignal: stimmhafte Harmonische mit gleitender Grundfrequenz,
+    Silben-Hüllkurve (~4 Hz) und etwas Rauschen. Reproduzierbar, kein Download nötig."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * rate), dtype=np.float32) / rate
+    f0 = 120 + 40 * np.sin(2 * np.pi * 0.3 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / rate
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 8))
+    envelope = np.clip(np.sin(2 * np.pi * 4 * t), 0, None) ** 0.5
+    audio = 0.25 * voiced * envelope + 0.01 * rng.standard_normal(len(t))
+    return audio.astype(np.float32)
+
+
+class AutoTuner:
+    """Misst Präzision x Threads x Batchgrösse auf dieser Maschine.
+
+    Jede Messung dekodiert genau ``DECODE_TOKENS`` Tokens (min = max), damit alle
+    Varianten gleich viel Arbeit haben, egal was Whisper im Testclip "hört".
+    Ausgewählt wird die schnellste Kombination für ein einzelnes Segment
+    (Diktier-Latenz); die Batchgrösse nur, wenn sie pro Segment deutlich schneller ist.
+    """
+
+    DECODE_TOKENS = 24
+    REPEATS = 3
+    BATCH_GAIN = 0.9  # Batch muss pro Segment mindestens 10 % schneller sein
+
+    def __init__(self, config, precisions=None, threads=None, batch_sizes=(1, 2, 4, 8), clip=None):
+        self.config = config
+        self.precisions = precisions
+        self.threads = threads
+        self.batch_sizes = tuple(sorted(set(int(b) for b in batch_sizes) | {1}))
+        self.clip = synthetic_clip() if clip is None else clip
+        self.results = []
+
+    def status(self, message):
+        send_json({"type": "status", "message": f"[autotune] {message}"})
+
+    @staticmethod
+    def thread_candidates():
+        cpus = os.cpu_count() or 4
+        candidates = {n for n in (1, 2, 4, 8, 16, 32, 64) if n <= cpus}
+        candidates |= {cpus, max(1, cpus // 2)}  # physische Kerne bei SMT meist cpus/2
+        return sorted(candidates)
+
+    def precision_candidates(self, device):
+        if self.precisions:
+            return list(self.precisions)
+        # int8 (dynamisch) gibt es nur auf der CPU, "auto" = fp16 auf der GPU
+        return ["auto", "fp32", "bf16"] if "cuda" in device else ["fp32", "bf16", "int8"]
+
+    def measure(self, transcriber, batch):
+        inputs = [{"raw": self.clip, "sampling_rate": transcriber.SAMPLE_RATE} for _ in range(batch)]
+        kwargs = {"language": "de", "task": "transcribe",
+                  "max_new_tokens": self.DECODE_TOKENS, "min_new_tokens": self.DECODE_TOKENS}
+        payload = inputs if batch > 1 else inputs[0]
+        transcriber.pipe(payload, batch_size=batch, generate_kwargs=kwargs)  # Warmup
+        times = []
+        for _ in range(self.REPEATS):
+            t0 = time.perf_counter()
+            transcriber.pipe(payload, batch_size=batch, generate_kwargs=kwargs)
+            times.append(time.perf_counter() - t0)
+        return float(np.median(times)) / batch
+
+    def record(self, precision, threads, batch, seconds):
+        result = {"precision": precision, "threads": threads, "batch": batch, "ms_per_clip": round(seconds * 1000.0, 1)}
+        self.results.append(result)
+        self.status(f"{precision} threads={threads or 'default'} batch={batch}: {result['ms_per_clip']} ms/clip")
+        return result
+
+    def run(self):
+        import torch
+        device = "cuda:0" if torch.cuda.is_available() else "cpu"
+        default_threads = torch.get_num_threads()
+        thread_options = [0] if "cuda" in device else (self.threads or self.thread_candidates())
+        t_start = time.perf_counter()
+
+        for precision in self.precision_candidates(device):
+            # Ohne Modell-Cache: sonst laufen GB-grosse safetensors Writes im Hintergrund mit (verfälscht
+            # die Messung) und werden beim Prozessende mittendrin abgebrochen
+            conf = {**self.config, "inference_precision": precision, "compile_model": False, "torch_threads": 0,
+                    "model_cache": False}
+            transcriber = SwissTranscriber.from_config(conf)
+            try:
+                transcriber.load()
+            except Exception as e:
+                self.status(f"{precision}: load failed ({e}), skipped")
+                continue
+            if transcriber.device != device:
+                self.status(f"{precision}: fell back to {transcriber.device}, skipped")
+                self._free(transcriber)
+                continue
+
+            try:
+                singles = []
+                for threads in thread_options:
+                    if threads: torch.set_num_threads(threads)
+                    singles.append(self.record(precision, threads, 1, self.measure(transcriber, 1)))
+                best = min(singles, key=lambda r: r["ms_per_clip"])
+                if best["threads"]: torch.set_num_threads(best["threads"])
+                for batch in self.batch_sizes[1:]:
+                    self.record(precision, best["threads"], batch, self.measure(transcriber, batch))
+            except Exception as e:
+                # z.B. bf16 ohne CPU-Unterstützung
+                self.status(f"{precision}: benchmark failed ({e}), skipped")
+            finally:
+                torch.set_num_threads(default_threads)
+                self._free(transcriber)
+
+        if not self.results:
+            raise RuntimeError("Autotune: no configuration could be measured")
+        return self.report(device, time.perf_counter() - t_start)
+
+    def report(self, device, seconds):
+        singles = [r for r in self.results if r["batch"] == 1]
+        best = min(singles, key=lambda r: r["ms_per_clip"])
+        batches = [r for r in self.results if r["precision"] == best["precision"] and r["threads"] == best["threads"]]
+        best_batch = min(batches, key=lambda r: r["ms_per_clip"])
+        batch_size = best_batch["batch"] if best_batch["ms_per_clip"] <= best["ms_per_clip"] * self.BATCH_GAIN else 1
+        return {
+            "type": "autotune_result",
+            "device": device,
+            "cpus": os.cpu_count(),
+            "seconds": round(seconds, 1),
+            "settings": {
+                "inference_precision": best["precision"],
+                "torch_threads": best["threads"],
+                "batch_max_size": batch_size,
+            },
+            "best_ms_per_clip": best["ms_per_clip"],
+            "results": self.results,
+        }
+
+    @staticmethod
+    def _free(transcriber):
+        transcriber.pipe = None
+        gc.collect()
+        try:
+            import torch
+            if torch.cuda.is_available(): torch.cuda.empty_cache()
+        except Exception:
+            pass
+
+
+def run_autotune(argv):
+    """CLI: main.py --autotune [--precisions fp32,int8] [--threads 4,8] [--clip file.wav] [--dry-run]"""
+    parser = argparse.ArgumentParser(prog="main.py --autotune")
+    parser.add_argument("--autotune", action="store_true")
+    parser.add_argument("--precisions", help="Kommagetrennt, z.B. fp32,bf16,int8")
+    parser.add_argument("--threads", help="Kommagetrennt, z.B. 2,4,8")
+    parser.add_argument("--batch-sizes", default="1,2,4,8")
+    parser.add_argument("--clip", metavar="WAV", help="Eigener Testclip statt des synthetischen Signals")
+    parser.add_argument("--dry-run", action="store_true", help="Nur messen, Config nicht ändern")
+    args = parser.parse_args(argv)
+
+    config_mgr = ConfigManager()
+    clip = None
+    if args.clip:
+        from core.benchmark import load_wav
+        clip = load_wav(args.clip).astype(np.float32) / 32768.0
+    tuner = AutoTuner(
+        config_mgr.load(),
+        precisions=args.precisions.split(",") if args.precisions else None,
+        threads=[int(n) for n in args.threads.split(",")] if args.threads else None,
+        batch_sizes=[int(n) for n in args.batch_sizes.split(",")],
+        clip=clip,
+    )
+    try:
+        report = tuner.run()
+    except Exception as e:
+        send_json({"type": "error", "message": str(e)})
+        return 1
+    if not args.dry_run:
+        # Gilt ab dem nächsten Start (Modell wird mit Präzision/Threads geladen)
+        for key, value in report["settings"].items():
+            config_mgr.set(key, value)
+        config_mgr.flush()
+    send_json(report)
+    return 0
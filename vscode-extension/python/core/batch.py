@@ -0,0 +1,185 @@
+import os
+import glob
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from core.config import ConfigManager
+from core.transcriber import SwissTranscriber
+from core.benchmark import load_wav, apply_overrides
+from core.protocol import send_json
+
+AUDIO_EXTENSIONS = (".wav",)
+
+
+def find_files(pattern):
+    """Ordner (rekursiv) oder Glob-Muster -> sortierte Liste absoluter Pfade."""
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, "**", "*")
+    files = [f for f in glob.glob(pattern, recursive=True)
+             if os.path.isfile(f) and f.lower().endswith(AUDIO_EXTENSIONS)]
+    return sorted(os.path.abspath(f) for f in files)
+
+
+def load_done(output_path):
+    # Resume: Dateien mit Ergebnis überspringen, Fehler werden neu versucht.
+    # Eine abgeschnittene letzte Zeile (Abbruch beim Schreiben) wird ignoriert.
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue
+            if "text" in result:
+                done.add(result["file"])
+    return done
+
+
+def chunked(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+# --- Worker (eigener Prozess, eigenes Modell) ---
+_transcriber = None
+
+
+def _init_worker(config):
+    global _transcriber
+    _transcriber = SwissTranscriber.from_config(config)
+    _transcriber.load()
+
+
+def transcribe_files(paths, transcriber=None, silence_threshold=5):
+    """Transkribiert eine Gruppe Dateien in einem Pipeline-Aufruf, ein Ergebnis-Dict pro Datei."""
+    transcriber = transcriber or _transcriber
+    results, audios, loaded = [], [], []
+    for path in paths:
+        try:
+            audio = load_wav(path)
+            audios.append(audio)
+            loaded.append(path)
+        except Exception as e:
+            results.append({"file": path, "error": f"Read Error: {e}"})
+    if not loaded:
+        return results
+
+    t0 = time.perf_counter()
+    try:
+        texts = transcriber.transcribe_batch(audios, None, silence_threshold)
+    except Exception as e:
+        return results + [{"file": path, "error": str(e)} for path in loaded]
+    seconds = round(time.perf_counter() - t0, 3)
+
+    for path, audio, text, reason in zip(loaded, audios, texts, transcriber.last_reasons):
+        results.append({
+            "file": path,
+            "text": text or "",
+            # None = keine Sprache / Halluzination verworfen, reason sagt warum
+            "dropped": text is None,
+            "reason": reason,
+            "audio_s": round(len(audio) / transcriber.SAMPLE_RATE, 2),
+            "batch_s": seconds,
+            "batch": len(loaded),
+            "pid": os.getpid(),
+        })
+    return results
+
+
+class BatchRunner:
+    """Archiv-Transkription: Dateien gruppiert (batch_size pro Modellaufruf) über
+    einen Prozess-Pool, Ergebnisse werden sofort als JSONL angehängt.
+
+    workers <= 1 läuft im aktuellen Prozess (nur ein Modell im Speicher).
+    Jeder zusätzliche Worker lädt ein eigenes Modell.
+    """
+
+    def __init__(self, config, output_path, workers=1, batch_size=4):
+        self.config = config
+        self.output_path = output_path
+        self.workers = max(1, int(workers))
+        self.batch_size = max(1, int(batch_size))
+        self.threshold = config.get('silence_threshold', 5)
+        self.written = 0
+        self.errors = 0
+
+    def status(self, message):
+        send_json({"type": "status", "message": f"[batch] {message}"})
+
+    def write(self, out, results):
+        for result in results:
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            if "error" in result: self.errors += 1
+            else: self.written += 1
+        # Sofort auf die Platte, damit ein Abbruch höchstens die laufende Gruppe kostet
+        out.flush()
+        os.fsync(out.fileno())
+
+    def run(self, files):
+        done = load_done(self.output_path)
+        todo = [f for f in files if f not in done]
+        self.status(f"{len(files)} files, {len(done)} already done, {len(todo)} to go ({self.workers} worker(s), batch {self.batch_size})")
+        if not todo:
+            return 0
+
+        groups = list(chunked(todo, self.batch_size))
+        t0 = time.perf_counter()
+        with open(self.output_path, "a", encoding="utf-8") as out:
+            if self.workers == 1:
+                transcriber = SwissTranscriber.from_config(self.config)
+                transcriber.load()
+                for group in groups:
+                    self.write(out, transcribe_files(group, transcriber, self.threshold))
+                    self.progress(len(todo), t0)
+            else:
+                self.run_pool(out, groups, len(todo), t0)
+        self.status(f"Finished: {self.written} ok, {self.errors} errors in {time.perf_counter() - t0:.1f}s")
+        return 1 if self.errors else 0
+
+    def run_pool(self, out, groups, total, t0):
+        # Nur wenige Gruppen gleichzeitig einreichen, damit Ergebnisse laufend geschrieben werden
+        groups = iter(groups)
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker, initargs=(self.config,)) as pool:
+            running = set()
+            while True:
+                while len(running) < self.workers * 2:
+                    group = next(groups, None)
+                    if group is None: break
+                    running.add(pool.submit(transcribe_files, group, None, self.threshold))
+                if not running: break
+                finished, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    self.write(out, future.result())
+                self.progress(total, t0)
+
+    def progress(self, total, t0):
+        n = self.written + self.errors
+        rate = n / max(time.perf_counter() - t0, 1e-6)
+        self.status(f"{n}/{total} ({rate:.2f} files/s)")
+
+
+def run_batch(argv):
+    parser = argparse.ArgumentParser(prog="main.py --batch")
+    parser.add_argument("--batch", metavar="DIR|GLOB", required=True, help="Ordner (rekursiv) oder Glob-Muster mit *.wav Dateien")
+    parser.add_argument("--output", metavar="FILE", default="alpencode_batch.jsonl", help="JSONL Ergebnisdatei (wird fortgesetzt)")
+    parser.add_argument("--workers", type=int, default=1, help="Anzahl Prozesse (je ein Modell)")
+    parser.add_argument("--batch-size", type=int, default=None, help="Dateien pro Modellaufruf (Default: batch_max_size)")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE", help="Config-Wert nur für diesen Lauf überschreiben")
+    args = parser.parse_args(argv)
+
+    files = find_files(args.batch)
+    if not files:
+        send_json({"type": "error", "message": f"No audio files for {args.batch}"})
+        return 1
+
+    config = apply_overrides(ConfigManager().load(), args.set)
+    batch_size = args.batch_size or config.get('batch_max_size', 4)
+    try:
+        return BatchRunner(config, os.path.abspath(args.output), args.workers, batch_size).run(files)
+    except KeyboardInterrupt:
+        # Bereits geschriebene Zeilen bleiben, der nächste Lauf macht dort weiter
+        send_json({"type": "status", "message": "[batch] Interrupted, rerun to resume"})
+        return 130
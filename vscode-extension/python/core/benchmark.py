@@ -0,0 +1,238 @@
+import os
+import re
+import json
+import time
+import glob
+import argparse
+import threading
+import numpy as np
+from core.config import ConfigManager
+from core.audio import AudioEngine, AudioSegment
+from core.transcriber import SwissTranscriber
+from core.metrics import peak_rss_mb
+from core.protocol import send_json
+
+_WORDS = re.compile(r"\w+", re.UNICODE)
+
+
+def find_pairs(directory):
+    """Alle *.wav im Ordner, Referenztext in gleichnamiger .txt Datei (optional)."""
+    pairs = []
+    for wav in sorted(glob.glob(os.path.join(directory, "*.wav"))):
+        txt = os.path.splitext(wav)[0] + ".txt"
+        reference = None
+        if os.path.exists(txt):
+            with open(txt, "r", encoding="utf-8") as f:
+                reference = f.read().strip()
+        pairs.append((wav, reference))
+    return pairs
+
+
+def load_wav(path, rate=AudioEngine.RATE):
+    # WAV -> mono int16 mit der Rate der AudioEngine, wie es vom Mikrofon käme
+    from scipy.io import wavfile
+    src_rate, data = wavfile.read(path)
+    if data.ndim > 1:
+        data = data.mean(axis=1)
+    if data.dtype != np.int16:
+        data = np.asarray(data, dtype=np.float32)
+        if np.abs(data).max(initial=0) <= 1.0:
+            data = data * 32767.0
+    if src_rate != rate:
+        from math import gcd
+        from scipy.signal import resample_poly
+        g = gcd(int(src_rate), int(rate))
+        data = resample_poly(np.asarray(data, dtype=np.float32), rate // g, src_rate // g)
+    return np.clip(data, -32768, 32767).astype(np.int16)
+
+
+def normalize_words(text):
+    return [w.lower() for w in _WORDS.findall(text or "")]
+
+
+def word_errors(reference, hypothesis):
+    # Levenshtein auf Wortebene (Substitution, Einfügung, Löschung), eine Zeile Speicher
+    row = list(range(len(hypothesis) + 1))
+    for i, ref in enumerate(reference, 1):
+        prev, row[0] = row[0], i
+        for j, hyp in enumerate(hypothesis, 1):
+            cur = min(row[j] + 1, row[j - 1] + 1, prev + (ref != hyp))
+            prev, row[j] = row[j], cur
+    return row[-1]
+
+
+def percentiles(values):
+    if not values:
+        return None
+    arr = np.asarray(values, dtype=np.float64)
+    return {
+        "p50": round(float(np.percentile(arr, 50)), 1),
+        "p90": round(float(np.percentile(arr, 90)), 1),
+        "p95": round(float(np.percentile(arr, 95)), 1),
+        "p99": round(float(np.percentile(arr, 99)), 1),
+        "mean": round(float(arr.mean()), 1),
+        "max": round(float(arr.max()), 1),
+    }
+
+
+class BenchmarkRunner:
+    """Spielt WAV Dateien chunkweise durch die AudioEngine-Segmentierung und den Transcriber.
+
+    realtime=True füttert die Chunks im Aufnahmetempo (Latenz wie beim Diktieren),
+    sonst so schnell wie möglich (Durchsatz). Die Latenz wird vom "Loslassen"
+    (Ende der Datei, stop_recording) bis zum letzten Text gemessen.
+    """
+
+    def __init__(self, config, transcriber, realtime=False):
+        self.config = config
+        self.transcriber = transcriber
+        self.realtime = realtime
+
+    def run_file(self, path, reference=None):
+        audio = load_wav(path)
+        engine = AudioEngine()
+        c = self.config
+        # Partials aus: gemessen wird der finale Pfad
+        engine.configure_recording(
+            c['silence_threshold'],
+            streaming=bool(c.get('streaming_active', False)),
+            stream_pause_ms=int(c.get('stream_pause', 500)),
+            stop_pause_s=float(c.get('auto_stop_delay', 3.0)),
+            vad_config=c,
+            predecode_pause_ms=int(c.get('predecode_pause_ms', 600))
+        )
+        audio_queue = engine.get_queue()
+        texts = []
+        stats = {"inference_s": 0.0, "segments": 0, "done_at": None}
+
+        def worker():
+            while True:
+                item = audio_queue.get()
+                if item == "CMD_STOP":
+                    stats["done_at"] = time.perf_counter()
+                    return
+                if isinstance(item, AudioSegment) and not item.partial and len(item) > 0:
+                    t0 = time.perf_counter()
+                    text = self.transcriber.transcribe(item.audio, None, c['silence_threshold'])
+                    stats["inference_s"] += time.perf_counter() - t0
+                    stats["segments"] += 1
+                    if text: texts.append(text)
+
+        thread = threading.Thread(target=worker, daemon=True)
+        thread.start()
+
+        chunk = engine.CHUNK
+        start = time.perf_counter()
+        for offset in range(0, len(audio), chunk):
+            if self.realtime:
+                delay = start + offset / engine.RATE - time.perf_counter()
+                if delay > 0: time.sleep(delay)
+            if not engine.process_chunk(audio[offset:offset + chunk]):
+                break  # Auto-Stop hat CMD_STOP schon gelegt
+
+        released = time.perf_counter()
+        if engine.recording:
+            engine.stop_recording()
+            audio_queue.put("CMD_STOP")
+        thread.join()
+
+        audio_s = len(audio) / engine.RATE
+        hypothesis = " ".join(texts)
+        result = {
+            "file": os.path.basename(path),
+            "audio_s": round(audio_s, 2),
+            "segments": stats["segments"],
+            "latency_ms": round((stats["done_at"] - released) * 1000.0, 1),
+            "inference_s": round(stats["inference_s"], 3),
+            "rtf": round(stats["inference_s"] / audio_s, 3) if audio_s else None,
+            "text": hypothesis,
+        }
+        if reference is not None:
+            ref_words = normalize_words(reference)
+            result["ref_words"] = len(ref_words)
+            result["word_errors"] = word_errors(ref_words, normalize_words(hypothesis))
+            result["wer"] = round(result["word_errors"] / len(ref_words), 4) if ref_words else None
+        return result
+
+    def run(self, pairs):
+        results = []
+        wall0 = time.perf_counter()
+        for path, reference in pairs:
+            result = self.run_file(path, reference)
+            results.append(result)
+            send_json({"type": "status", "message": f"[bench] {result['file']}: {result['latency_ms']} ms, RTF {result['rtf']}"})
+        wall_s = time.perf_counter() - wall0
+        return self.report(results, wall_s)
+
+    def report(self, results, wall_s):
+        t = self.transcriber
+        audio_s = sum(r["audio_s"] for r in results)
+        inference_s = sum(r["inference_s"] for r in results)
+        ref_words = sum(r.get("ref_words", 0) for r in results)
+        errors = sum(r.get("word_errors", 0) for r in results)
+        return {
+            "type": "benchmark",
+            "model_id": t.model_id,
+            "precision": t.precision,
+            "device": t.device,
+            "dtype": str(t.torch_dtype).replace("torch.", ""),
+            "compiled": t.compiled,
+            "load_s": round(t.load_seconds or 0.0, 2),
+            "mode": "realtime" if self.realtime else "max",
+            "files": len(results),
+            "audio_s": round(audio_s, 2),
+            "wall_s": round(wall_s, 2),
+            "inference_s": round(inference_s, 2),
+            "rtf": round(inference_s / audio_s, 4) if audio_s else None,
+            "latency_ms": percentiles([r["latency_ms"] for r in results]),
+            # WER über alle Dateien (Fehler / Referenzwörter), nicht Mittel der Einzel-WERs
+            "wer": round(errors / ref_words, 4) if ref_words else None,
+            "peak_rss_mb": peak_rss_mb(),
+            "config": {k: self.config.get(k) for k in (
+                "silence_threshold", "streaming_active", "stream_pause", "predecode_pause_ms", "vad_mode",
+                "inference_precision", "compile_model", "batch_max_size")},
+            "results": results,
+        }
+
+
+def parse_value(raw):
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return raw
+
+
+def apply_overrides(config, items):
+    # --set key=value (Wert als JSON, sonst String)
+    for item in items:
+        key, _, raw = item.partition("=")
+        config[key.strip()] = parse_value(raw.strip())
+    return config
+
+
+def run_benchmark(argv):
+    parser = argparse.ArgumentParser(prog="main.py --benchmark")
+    parser.add_argument("--benchmark", metavar="DIR", required=True, help="Ordner mit *.wav (+ gleichnamige .txt Referenz)")
+    parser.add_argument("--realtime", action="store_true", help="Audio im Aufnahmetempo abspielen")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE", help="Config-Wert nur für diesen Lauf überschreiben")
+    parser.add_argument("--output", metavar="FILE", help="Report zusätzlich als JSON-Datei schreiben")
+    args = parser.parse_args(argv)
+
+    pairs = find_pairs(args.benchmark)
+    if not pairs:
+        send_json({"type": "error", "message": f"No *.wav files in {args.benchmark}"})
+        return 1
+
+    # Eigene Kopie der Config, Overrides werden nicht gespeichert
+    config = ConfigManager().load()
+    apply_overrides(config, args.set)
+
+    transcriber = SwissTranscriber.from_config(config)
+    transcriber.load()
+
+    report = BenchmarkRunner(config, transcriber, realtime=args.realtime).run(pairs)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    send_json(report, ensure_ascii=False)
+    return 0
@@ -4,6 +4,10 @@ import platform
 import tempfile
 from pathlib import Path
 import sys
+import time
+import atexit
+import threading
+from core.protocol import send_json
 
 class ConfigManager:
     # 1. Temporäres Verzeichnis für Aufnahmen (wird bei Deinstall gelöscht)
@@ -14,11 +18,63 @@ class ConfigManager:
         # Standard: Aufnahmen im Temp-Ordner speichern
         "save_folder": str(TEMP_DIR / "AlpenCode_Recordings"),
         "model_id": "Flurin17/whisper-large-v3-turbo-swiss-german",
-        "silence_threshold": 5,
+        # "auto" = fp16 auf GPU / fp32 auf CPU, sonst "fp32", "bf16" oder "int8" (dynamisch, nur CPU)
+        "inference_precision": "auto",
+        # torch Threads für die Inferenz (0 = torch Default); wird vom autotune Befehl gesetzt
+        "torch_threads": 0,
+        # torch.compile + statischer KV-Cache (einmal beim Start, Fallback auf Eager)
+        "compile_model": False,
+        # Konvertierte Gewichte als safetensors im Config-Ordner cachen (mmap beim nächsten Start)
+        "model_cache": True,
+        # Modell nach so vielen Sekunden ohne Diktat entladen, lädt beim nächsten Start neu (0 = nie)
+        "model_idle_unload_s": 1800,
+        # Ein gemeinsamer Modell-Daemon für alle Fenster (lokaler Socket / Named Pipe)
+        "shared_daemon": False,
+        "daemon_linger_s": 300,
+        "silence_threshold": 5.0,
         "streaming_active": False,      
         "auto_enter_active": True,      
         "stream_pause": 650,            
-        "auto_stop_delay": 15.0         
+        "auto_stop_delay": 15.0,
+        # Push-to-talk: Teilstücke an Pausen > predecode_pause_ms schon während der Aufnahme dekodieren (0 = aus)
+        "predecode_pause_ms": 600,
+        # Ausgabe: "keystroke" (Tippen, geht überall hin wo der Fokus ist), "clipboard" (Paste) oder
+        # "editor" (Extension fügt per TextEditor.edit in den aktiven Editor ein, auch wenn Terminal/Chat den Fokus hat)
+        "output_mode": "keystroke",
+        # Paste-Shortcut für "clipboard", z.B. "ctrl+shift+v" für Linux-Terminals (leer = Ctrl+V / Cmd+V).
+        # Die vorherige Zwischenablage wird danach wiederhergestellt (nur Text, keine Bilder/Dateien)
+        "paste_hotkey": "",
+        # Live-Partials im Streaming-Modus: Fenster alle partial_interval_ms neu dekodieren
+        "live_partials": False,
+        "partial_interval_ms": 600,
+        # Voice Activity Detection ("energy" = Energie/ZCR/Flachheit, "rms" = nur Energie, "webrtc" falls installiert)
+        "vad_mode": "energy",
+        "vad_frame_ms": 20,
+        "vad_hangover_ms": 200,
+        "vad_min_speech_ms": 60,
+        "vad_min_silence_ms": 100,
+        # Vor der Inferenz: Stille vorne/hinten abschneiden, Pausen auf trim_max_pause_ms kürzen (Rand trim_guard_ms)
+        "trim_silence": True,
+        "trim_guard_ms": 150,
+        "trim_max_pause_ms": 400,
+        # Micro-Batching im Worker: bis zu batch_max_size wartende Segmente pro Pipeline-Aufruf
+        "batch_max_size": 4,
+        "batch_max_wait_ms": 0,
+        # Neuer Start bricht die noch laufende Transkription der letzten Aufnahme ab (Partials immer)
+        "preempt_on_start": False,
+        # Halluzinations-Filter: zlib-Kompressionsrate, Wort-n-Gramm Wiederholungen, direkte Wortschleifen
+        "hallucination_max_compression": 2.4,
+        "hallucination_ngram": 3,
+        "hallucination_max_ngram_repeats": 3,
+        "hallucination_max_ngram_ratio": 0.3,
+        "hallucination_loop_repeats": 3,
+        # Korrektur-Wörterbuch (JSON {"falsch": "richtig"}); leer = <config_dir>/vocabulary.json,
+        # zusätzlich <workspace>/.alpencode/vocabulary.json
+        "vocabulary_file": "",
+        "vocabulary_case_sensitive": False,
+        "vocabulary_whole_word": True,
+        # Debug: jedes Segment zusätzlich als tmp.wav in save_folder schreiben
+        "debug_save_audio": False
     }    
 
     @staticmethod
@@ -31,26 +87,108 @@ class ConfigManager:
         else:
             return Path.home() / ".config" / "alpencode"
 
+    # mtime der Datei höchstens so oft prüfen (andere Fenster schreiben selten)
+    MTIME_CHECK_INTERVAL = 1.0
+    # Schreibvorgänge werden gesammelt und erst nach dieser Pause atomar geschrieben
+    FLUSH_DELAY = 0.3
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._cache = None
+        self._mtime = None
+        self._last_check = 0.0
+        self._dirty_keys = set()
+        self._flush_timer = None
+        self._subscribers = []
+        atexit.register(self.flush)
+
+    def _config_file(self):
+        return self.get_config_dir() / "config.json"
+
     def load(self):
-        config_dir = self.get_config_dir()
-        config_file = config_dir / "config.json"
-        
+        """Gecachte Config (Kopie). Die Datei wird nur neu gelesen, wenn sich ihre mtime geändert hat."""
+        changed = {}
+        with self._lock:
+            now = time.monotonic()
+            if self._cache is None or now - self._last_check >= self.MTIME_CHECK_INTERVAL:
+                self._last_check = now
+                mtime = self._file_mtime()
+                if self._cache is None or mtime != self._mtime:
+                    old = self._cache
+                    self._cache = self._read_file()
+                    self._mtime = mtime
+                    if old is not None:
+                        # Noch nicht geschriebene eigene Änderungen gewinnen gegen die Datei
+                        self._cache.update({k: old[k] for k in self._dirty_keys})
+                        changed = {k: v for k, v in self._cache.items()
+                                   if k not in self._dirty_keys and old.get(k) != v}
+            data = dict(self._cache)
+        if changed:
+            self._notify(changed)
+        return data
+
+    def invalidate(self):
+        # Explizite Benachrichtigung: beim nächsten load() sicher neu lesen
+        with self._lock:
+            self._last_check = 0.0
+            self._mtime = None
+
+    @classmethod
+    def coerce(cls, key, value):
+        """Textwert (Legacy-Befehl, Settings-Panel) in den Typ des Defaults umwandeln."""
+        default = cls.DEFAULT_CONFIG.get(key)
+        if not isinstance(value, str) or default is None or isinstance(default, str):
+            return value
+        text = value.strip()
+        if text.lower() in ("none", "null"):
+            return None
+        # bool vor int prüfen (bool ist eine int-Unterklasse)
+        if isinstance(default, bool):
+            return text.lower() in ("true", "1", "yes", "on")
+        if isinstance(default, int):
+            return int(float(text))
+        if isinstance(default, float):
+            return float(text)
+        return value
+
+    def get(self, key, default=None):
+        return self.load().get(key, self.DEFAULT_CONFIG.get(key, default))
+
+    def set(self, key, value):
+        self.save({key: value})
+
+    def subscribe(self, callback):
+        """callback(changed: dict) wird bei geänderten Keys aufgerufen (eigene und fremde Änderungen)."""
+        with self._lock:
+            self._subscribers.append(callback)
+        return lambda: self._subscribers.remove(callback)
+
+    def _notify(self, changed):
+        for callback in list(self._subscribers):
+            try:
+                callback(changed)
+            except Exception as e:
+                send_json({"type": "error", "message": f"Config Listener Error: {e}"})
+
+    def _file_mtime(self):
+        try:
+            return os.stat(self._config_file()).st_mtime_ns
+        except OSError:
+            return None
+
+    def _read_file(self):
+        data = self.DEFAULT_CONFIG.copy()
+        config_file = self._config_file()
         if config_file.exists():
             try:
                 with open(config_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    return data
+                    data.update(json.load(f))
             except Exception as e:
-                print(json.dumps({"type": "error", "message": f"Config Load Error: {e}"}))
-                return self.DEFAULT_CONFIG.copy()
-        
-        return self.DEFAULT_CONFIG.copy()
+                send_json({"type": "error", "message": f"Config Load Error: {e}"})
+        return data
 
     def save(self, new_config):
-        config_dir = self.get_config_dir()
-        config_dir.mkdir(parents=True, exist_ok=True)
-        config_file = config_dir / "config.json"
-        
+        """Übernimmt Änderungen sofort in den Cache, geschrieben wird verzögert (flush)."""
         save_folder = Path(new_config.get("save_folder", self.DEFAULT_CONFIG["save_folder"]))
         try:
             if not save_folder.exists():
@@ -58,17 +196,59 @@ class ConfigManager:
         except:
             pass 
 
-        try:
-            current_data = {}
-            if config_file.exists():
+        self.load()
+        with self._lock:
+            changed = {k: v for k, v in new_config.items() if self._cache.get(k) != v}
+            self._cache.update(changed)
+            self._dirty_keys.update(changed)
+            if changed:
+                if self._flush_timer is not None:
+                    self._flush_timer.cancel()
+                self._flush_timer = threading.Timer(self.FLUSH_DELAY, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+        if changed:
+            self._notify(changed)
+
+    def flush(self):
+        """Schreibt geänderte Keys atomar (Temp-Datei + rename), Änderungen anderer Fenster bleiben erhalten."""
+        foreign = {}
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if not self._dirty_keys:
+                return
+            config_dir = self.get_config_dir()
+            config_file = self._config_file()
+            try:
+                config_dir.mkdir(parents=True, exist_ok=True)
+                current_data = {}
+                if config_file.exists():
+                    try:
+                        with open(config_file, 'r', encoding='utf-8') as f:
+                            current_data = json.load(f)
+                    except: pass
+                
+                current_data.update({k: self._cache[k] for k in self._dirty_keys})
+                
+                fd, tmp_path = tempfile.mkstemp(prefix=".config.", suffix=".tmp", dir=str(config_dir))
                 try:
-                    with open(config_file, 'r', encoding='utf-8') as f:
-                        current_data = json.load(f)
-                except: pass
-            
-            current_data.update(new_config)
-            
-            with open(config_file, 'w', encoding='utf-8') as f:
-                json.dump(current_data, f, indent=2)
-        except Exception as e:
-            print(json.dumps({"type": "error", "message": f"Config Save Error: {e}"}))
\ No newline at end of file
+                    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                        json.dump(current_data, f, indent=2)
+                        f.flush()
+                        os.fsync(f.fileno())
+                    os.replace(tmp_path, config_file)
+                except BaseException:
+                    try: os.unlink(tmp_path)
+                    except OSError: pass
+                    raise
+
+                self._dirty_keys.clear()
+                self._mtime = self._file_mtime()
+                foreign = {k: v for k, v in current_data.items() if self._cache.get(k) != v}
+                self._cache.update(foreign)
+            except Exception as e:
+                send_json({"type": "error", "message": f"Config Save Error: {e}"})
+        if foreign:
+            self._notify(foreign)
@@ -0,0 +1,424 @@
+import os
+import sys
+import time
+import secrets
+import platform
+import threading
+import subprocess
+from collections import deque
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener, Client
+from core.config import ConfigManager
+from core.protocol import send_json
+
+
+def get_daemon_address():
+    # Ein Daemon pro Benutzer: Named Pipe unter Windows, Unix Domain Socket sonst
+    if platform.system() == "Windows":
+        user = os.environ.get("USERNAME", "user")
+        return rf"\\.\pipe\alpencode-{user}"
+    return str(ConfigManager.get_config_dir() / "daemon.sock")
+
+
+def get_authkey():
+    # Gemeinsames Secret im Config-Ordner, damit nur der eigene Benutzer den Daemon nutzen kann
+    config_dir = ConfigManager.get_config_dir()
+    config_dir.mkdir(parents=True, exist_ok=True)
+    key_file = config_dir / "daemon.key"
+    if not key_file.exists():
+        # Mehrere Fenster starten gleichzeitig: Key komplett in eine Temp-Datei schreiben und
+        # atomar anlegen (link schlägt fehl, wenn ein anderes Fenster schneller war -> dessen Key gilt)
+        tmp = config_dir / f"daemon.key.{os.getpid()}.tmp"
+        fd = os.open(str(tmp), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(secrets.token_hex(32))
+        try:
+            os.link(tmp, key_file)
+        except FileExistsError:
+            pass
+        except OSError:
+            # Dateisystem ohne Hardlinks
+            if not key_file.exists():
+                os.replace(tmp, key_file)
+        finally:
+            try: os.unlink(tmp)
+            except OSError: pass
+    deadline = time.monotonic() + 5
+    while True:
+        key = key_file.read_text().strip()
+        if key or time.monotonic() > deadline:
+            break
+        time.sleep(0.05)  # alte, gerade erst angelegte Datei ohne Inhalt
+    if not key:
+        raise RuntimeError(f"Empty daemon key file: {key_file}")
+    return key.encode()
+
+
+class ModelDaemon:
+    """Lädt das Modell einmal und bedient beliebig viele main.py Frontends.
+
+    Jede Verbindung bekommt eine eigene Request-Queue, der Inferenz-Thread
+    arbeitet die Queues reihum ab (ein Request pro Client und Runde), damit
+    ein Fenster mit vielen Segmenten die anderen nicht aushungert.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.transcriber = None
+        self.ready = threading.Event()
+        self.cond = threading.Condition()
+        self.clients = {}  # client_id -> deque[(conn, request)]
+        self.order = deque()  # Round-Robin Reihenfolge der client_ids
+        self.running = True
+        self.last_client_seen = time.monotonic()
+        self.current_client = None  # Client des gerade laufenden Jobs (für cancel)
+        self._lock_file = None
+
+    def log(self, message):
+        send_json({"type": "status", "message": f"[daemon] {message}"})
+
+    def serve(self):
+        if not self._acquire_singleton_lock():
+            self.log("Another daemon is already running.")
+            return
+
+        address = get_daemon_address()
+        if platform.system() != "Windows" and os.path.exists(address):
+            os.unlink(address)  # verwaister Socket eines abgestürzten Daemons
+        listener = Listener(address, authkey=get_authkey())
+        if platform.system() != "Windows":
+            os.chmod(address, 0o600)
+        self.log(f"Listening on {address}")
+
+        threading.Thread(target=self._load_model, daemon=True).start()
+        threading.Thread(target=self._inference_loop, daemon=True).start()
+        threading.Thread(target=self._linger_watch, args=(listener,), daemon=True).start()
+
+        client_id = 0
+        while self.running:
+            try:
+                conn = listener.accept()
+            except Exception:
+                if not self.running: break
+                continue
+            client_id += 1
+            threading.Thread(target=self._client_loop, args=(client_id, conn), daemon=True).start()
+        listener.close()
+
+    def _load_model(self):
+        from core.transcriber import SwissTranscriber
+        try:
+            self.transcriber = SwissTranscriber.from_config(self.config)
+            # Korrekturen hängen vom Workspace des Fensters ab -> wendet jeder Client selbst an
+            self.transcriber.vocabulary = None
+            self.transcriber.load()
+            self.ready.set()
+            self.log("Model ready")
+        except Exception as e:
+            self.log(f"Model load failed: {e}")
+            self.running = False
+            os._exit(1)
+
+    def _client_loop(self, client_id, conn):
+        with self.cond:
+            self.clients[client_id] = deque()
+        self.log(f"Client {client_id} connected ({len(self.clients)} active)")
+        try:
+            while self.running:
+                request = conn.recv()
+                op = request.get("op")
+                if op == "ping":
+                    conn.send({"id": request.get("id"), "ready": self.ready.is_set()})
+                elif op == "stats":
+                    memory = self.transcriber.memory_stats() if self.transcriber else {"loaded": False}
+                    conn.send({"id": request.get("id"), "memory": memory})
+                elif op == "transcribe":
+                    with self.cond:
+                        self.clients[client_id].append((conn, request))
+                        if client_id not in self.order:
+                            self.order.append(client_id)
+                        self.cond.notify()
+                elif op == "cancel":
+                    self._cancel(client_id, request.get("preemptible_only", False))
+                elif op == "warm":
+                    # Ein Fenster startet eine Aufnahme: entladenes Modell schon jetzt neu laden
+                    if self.transcriber is not None and self.ready.is_set():
+                        self.transcriber.ensure_loaded()
+        except (EOFError, OSError):
+            pass
+        finally:
+            with self.cond:
+                self.clients.pop(client_id, None)
+                if client_id in self.order:
+                    self.order.remove(client_id)
+                self.last_client_seen = time.monotonic()
+            conn.close()
+            self.log(f"Client {client_id} disconnected ({len(self.clients)} active)")
+
+    def _cancel(self, client_id, preemptible_only):
+        # Nur die eigenen Jobs abbrechen, andere Fenster laufen weiter
+        dropped = []
+        with self.cond:
+            requests = self.clients.get(client_id)
+            if requests:
+                keep = deque()
+                for conn, request in requests:
+                    if preemptible_only and not request.get("preemptible"):
+                        keep.append((conn, request))
+                    else:
+                        dropped.append((conn, request))
+                self.clients[client_id] = keep
+                if not keep and client_id in self.order:
+                    self.order.remove(client_id)
+            if self.current_client == client_id and self.transcriber is not None:
+                self.transcriber.cancel(preemptible_only)
+        for conn, request in dropped:
+            try:
+                conn.send({"id": request.get("id"), "texts": [None] * len(request["audios"]),
+                           "reasons": ["cancelled"] * len(request["audios"])})
+            except (EOFError, OSError):
+                pass
+
+    def _next_request(self):
+        with self.cond:
+            while self.running and not self.order:
+                self.cond.wait(timeout=1.0)
+            if not self.order: return None
+            client_id = self.order.popleft()
+            requests = self.clients.get(client_id)
+            if not requests: return None
+            conn, request = requests.popleft()
+            if requests:
+                self.order.append(client_id)  # hinten anstellen -> Fairness
+            self.current_client = client_id
+            return conn, request
+
+    def _inference_loop(self):
+        self.ready.wait()
+        while self.running:
+            job = self._next_request()
+            if job is None: continue
+            conn, request = job
+            try:
+                texts = self.transcriber.transcribe_batch(
+                    request["audios"], request.get("save_path"), request.get("silence_threshold", 5),
+                    preemptible=request.get("preemptible", False)
+                )
+                reply = {"id": request.get("id"), "texts": texts, "timings": self.transcriber.last_timings,
+                         "reasons": self.transcriber.last_reasons}
+            except Exception as e:
+                reply = {"id": request.get("id"), "error": str(e)}
+            with self.cond:
+                self.current_client = None
+            try:
+                conn.send(reply)
+            except (EOFError, OSError):
+                pass
+
+    def _linger_watch(self, listener):
+        # Ohne Clients nach daemon_linger_s beenden, damit kein verwaister Prozess RAM belegt
+        linger = float(self.config.get('daemon_linger_s', 300))
+        idle_unload = float(self.config.get('model_idle_unload_s', 0) or 0)
+        while self.running:
+            time.sleep(5)
+            # Clients verbunden, aber niemand diktiert: Modell freigeben, der Prozess bleibt
+            if self.transcriber is not None and self.ready.is_set():
+                self.transcriber.unload_if_idle(idle_unload)
+            with self.cond:
+                idle = not self.clients and time.monotonic() - self.last_client_seen > linger
+            if idle:
+                self.log("No clients left, shutting down")
+                self.running = False
+                try: listener.close()
+                except Exception: pass
+                if platform.system() != "Windows":
+                    try: os.unlink(get_daemon_address())
+                    except OSError: pass
+                os._exit(0)
+
+    def _acquire_singleton_lock(self):
+        lock_path = ConfigManager.get_config_dir() / "daemon.lock"
+        lock_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock_file = open(lock_path, "a+")
+        try:
+            if platform.system() == "Windows":
+                import msvcrt
+                msvcrt.locking(self._lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            return False
+
+
+class RemoteTranscriber:
+    """Dünner Client mit derselben Schnittstelle wie SwissTranscriber.
+
+    Startet den Daemon bei Bedarf selbst und wartet, bis das Modell geladen ist.
+    """
+
+    CONNECT_TIMEOUT = 15
+    READY_TIMEOUT = 600
+
+    def __init__(self, script_path, vocabulary=None):
+        self.script_path = script_path
+        self.vocabulary = vocabulary
+        self.conn = None
+        self.lock = threading.Lock()
+        self.send_lock = threading.Lock()  # cancel darf nicht hinter einem laufenden _call warten
+        self.request_id = 0
+        self.ready = threading.Event()
+        self.load_error = None
+        self.last_timings = {}
+        self.last_reasons = []
+
+    def start_loading(self, on_ready=None, on_error=None):
+        # Verbindung + Warten auf den Daemon im Hintergrund, wie SwissTranscriber.start_loading
+        def run():
+            try:
+                self._connect()
+                self._wait_ready()
+            except Exception as e:
+                self.load_error = e
+                self.ready.set()
+                if on_error: on_error(e)
+                return
+            self.ready.set()
+            if on_ready: on_ready()
+        threading.Thread(target=run, daemon=True).start()
+
+    def wait_ready(self, timeout=None):
+        self.ready.wait(timeout)
+        if self.load_error is not None:
+            raise RuntimeError(f"Shared model daemon not available: {self.load_error}")
+        return self.conn is not None
+
+    def _connect(self):
+        address = get_daemon_address()
+        try:
+            self.conn = Client(address, authkey=get_authkey())
+            return
+        except (OSError, EOFError, AuthenticationError):
+            pass
+
+        send_json({"type": "status", "message": "Starting shared model daemon..."})
+        self._spawn_daemon()
+        deadline = time.monotonic() + self.CONNECT_TIMEOUT
+        error = None
+        while time.monotonic() < deadline:
+            try:
+                # Key jedes Mal neu lesen: beim ersten Start schreibt ihn evtl. gerade ein anderes Fenster
+                self.conn = Client(address, authkey=get_authkey())
+                return
+            except (OSError, EOFError, AuthenticationError) as e:
+                error = e
+                time.sleep(0.2)
+        raise RuntimeError(f"Shared model daemon did not start ({error})")
+
+    def _spawn_daemon(self):
+        log_path = ConfigManager.get_config_dir() / "daemon.log"
+        log = open(log_path, "a", encoding="utf-8")
+        kwargs = {"stdin": subprocess.DEVNULL, "stdout": log, "stderr": log, "cwd": os.path.dirname(self.script_path)}
+        if platform.system() == "Windows":
+            kwargs["creationflags"] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+        else:
+            kwargs["start_new_session"] = True  # überlebt das Schliessen des VS Code Fensters
+        subprocess.Popen([sys.executable, self.script_path, "--daemon"], **kwargs)
+
+    def _call(self, request):
+        with self.lock:
+            try:
+                reply = self._exchange(request)
+            except (EOFError, OSError) as e:
+                # Daemon weg (Absturz, OOM-Kill, beendet): neu verbinden bzw. neu starten, einmal wiederholen
+                send_json({"type": "status", "message": f"⚠️ Shared model daemon lost ({e or type(e).__name__}), reconnecting..."})
+                self._reconnect()
+                reply = self._exchange(request)
+        if "error" in reply:
+            raise RuntimeError(reply["error"])
+        return reply
+
+    def _exchange(self, request):
+        if self.conn is None:
+            raise OSError("not connected")
+        self.request_id += 1
+        request["id"] = self.request_id
+        with self.send_lock:
+            self.conn.send(request)
+        return self.conn.recv()
+
+    def _reconnect(self):
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+        self.conn = None
+        self._connect()
+        deadline = time.monotonic() + self.READY_TIMEOUT
+        while not self._exchange({"op": "ping"}).get("ready"):
+            if time.monotonic() > deadline:
+                raise RuntimeError("Shared model daemon not ready")
+            time.sleep(0.5)
+
+    def _wait_ready(self):
+        deadline = time.monotonic() + self.READY_TIMEOUT
+        while not self._call({"op": "ping"}).get("ready"):
+            if time.monotonic() > deadline:
+                raise RuntimeError("Shared model daemon not ready")
+            time.sleep(0.5)
+
+    def cancel(self, preemptible_only=False):
+        # Ohne Antwort: das Ergebnis des abgebrochenen Jobs kommt über den wartenden _call zurück
+        if self.conn is None: return
+        try:
+            with self.send_lock:
+                self.conn.send({"op": "cancel", "preemptible_only": preemptible_only})
+        except (EOFError, OSError):
+            pass
+
+    def ensure_loaded(self):
+        # Idle-Entladung macht der Daemon (für alle Fenster), hier nur das Neuladen anstossen
+        if self.conn is None: return
+        try:
+            with self.send_lock:
+                self.conn.send({"op": "warm"})
+        except (EOFError, OSError):
+            pass
+
+    def unload_if_idle(self, idle_s):
+        return False
+
+    def transcribe(self, audio, save_path=None, silence_threshold=5, preemptible=False):
+        return self.transcribe_batch([audio], save_path, silence_threshold, preemptible)[0]
+
+    def transcribe_batch(self, audios, save_path=None, silence_threshold=5, preemptible=False):
+        t0 = time.perf_counter()
+        self.wait_ready()
+        reply = self._call({
+            "op": "transcribe",
+            "audios": list(audios),
+            "save_path": save_path,
+            "silence_threshold": silence_threshold,
+            "preemptible": preemptible,
+        })
+        # Stufen des Daemons; alles andere (Verbindung, Jobs anderer Fenster, IPC) zählt als model_wait
+        timings = dict(reply.get("timings") or {})
+        work = sum(v for k, v in timings.items() if k != "model_wait")
+        timings["model_wait"] = round((time.perf_counter() - t0) * 1000.0 - work, 1)
+        self.last_timings = timings
+        self.last_reasons = reply.get("reasons") or [None] * len(audios)
+        texts = reply["texts"]
+        if self.vocabulary:
+            texts = [self.vocabulary.apply(t) if t else t for t in texts]
+        return texts
+
+    def memory_stats(self):
+        if self.conn is None or not self.ready.is_set():
+            return {"loaded": False, "shared_daemon": True}
+        return {**self._call({"op": "stats"})["memory"], "shared_daemon": True}
+
+
+def run_daemon():
+    config = ConfigManager().load()
+    ModelDaemon(config).serve()
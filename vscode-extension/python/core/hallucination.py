@@ -0,0 +1,100 @@
+import re
+import zlib
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+class HallucinationDetector:
+    """Erkennt typische Whisper-Schleifen in linearer Zeit (keine backtracking Regex).
+
+    Prüfungen, jeweils ein Durchlauf über den Text:
+    - char_run: ein Zeichen öfter als ``max_char_run`` mal hintereinander
+    - loop: ein Wortblock (1..max_loop_words Wörter, mind. 5 Zeichen) ``loop_repeats`` mal direkt hintereinander
+    - ngram: ein Wort-n-Gramm kommt öfter als ``max_ngram_repeats`` mal vor und mehr als
+      ``max_ngram_ratio`` aller n-Gramme sind Wiederholungen (verstreute Wiederholungen in langem Text sind normal)
+    - compression: zlib-Kompressionsrate über ``max_compression`` (wie Whisper, erst ab ``min_compression_chars``)
+
+    ``check`` gibt den Grund zurück (z.B. "loop") oder None.
+    """
+
+    def __init__(self, max_compression=2.4, min_compression_chars=100, ngram=3, max_ngram_repeats=3,
+                 max_ngram_ratio=0.3, loop_repeats=3, max_loop_words=8, max_char_run=10):
+        self.max_compression = float(max_compression)
+        self.min_compression_chars = int(min_compression_chars)
+        self.ngram = int(ngram)
+        self.max_ngram_repeats = int(max_ngram_repeats)
+        self.max_ngram_ratio = float(max_ngram_ratio)
+        self.loop_repeats = int(loop_repeats)
+        self.max_loop_words = int(max_loop_words)
+        self.max_char_run = int(max_char_run)
+
+    @classmethod
+    def from_config(cls, config):
+        config = config or {}
+        return cls(
+            max_compression=config.get('hallucination_max_compression', 2.4),
+            ngram=config.get('hallucination_ngram', 3),
+            max_ngram_repeats=config.get('hallucination_max_ngram_repeats', 3),
+            max_ngram_ratio=config.get('hallucination_max_ngram_ratio', 0.3),
+            loop_repeats=config.get('hallucination_loop_repeats', 3),
+        )
+
+    def check(self, text):
+        if not text or not text.strip():
+            return "empty"
+        if self._longest_char_run(text) > self.max_char_run:
+            return "char_run"
+        words = [w.lower() for w in _WORD.findall(text)]
+        if self._has_loop(words):
+            return "loop"
+        max_count, repeated_ratio = self._ngram_stats(words)
+        if max_count > self.max_ngram_repeats and repeated_ratio > self.max_ngram_ratio:
+            return "ngram"
+        if self.compression_ratio(text) > self.max_compression:
+            return "compression"
+        return None
+
+    @staticmethod
+    def _longest_char_run(text):
+        longest = run = 0
+        prev = None
+        for ch in text:
+            run = run + 1 if ch == prev else 1
+            prev = ch
+            if run > longest: longest = run
+        return longest
+
+    def _has_loop(self, words):
+        # Periode p: words[i] == words[i-p] über p*(repeats-1) Wörter am Stück = Block repeats-mal hintereinander
+        n = len(words)
+        for p in range(1, min(self.max_loop_words, n // self.loop_repeats) + 1):
+            need = p * (self.loop_repeats - 1)
+            run = 0
+            for i in range(p, n):
+                if words[i] == words[i - p]:
+                    run += 1
+                    if run >= need and sum(len(w) for w in words[i - p + 1:i + 1]) + p - 1 >= 5:
+                        return True
+                else:
+                    run = 0
+        return False
+
+    def _ngram_stats(self, words):
+        # (häufigstes n-Gramm, Anteil der n-Gramme, die ein früheres wiederholen)
+        total = len(words) - self.ngram + 1
+        if total <= 0:
+            return 0, 0.0
+        counts = {}
+        best = 0
+        for i in range(total):
+            key = tuple(words[i:i + self.ngram])
+            c = counts.get(key, 0) + 1
+            counts[key] = c
+            if c > best: best = c
+        return best, (total - len(counts)) / total
+
+    def compression_ratio(self, text):
+        data = text.encode("utf-8")
+        if len(data) < self.min_compression_chars:
+            return 0.0
+        return len(data) / len(zlib.compress(data))
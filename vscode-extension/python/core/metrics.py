@@ -0,0 +1,86 @@
+import sys
+import time
+import threading
+from collections import deque
+import numpy as np
+
+
+def now():
+    # Monotone Uhr mit hoher Auflösung (auch unter Windows), für alle Pipeline-Zeitstempel
+    return time.perf_counter()
+
+
+def ms(start, end):
+    return round((end - start) * 1000.0, 1)
+
+
+def process_rss_mb():
+    try:
+        import psutil
+        return round(psutil.Process().memory_info().rss / (1024 * 1024), 1)
+    except Exception:
+        pass
+    try:
+        # Linux ohne psutil: zweite Spalte von statm = residente Pages
+        import os
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return round(pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 1)
+    except Exception:
+        return None
+
+
+def peak_rss_mb():
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux: KB, macOS: Bytes
+        return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return round(getattr(info, "peak_wset", info.rss) / (1024 * 1024), 1)
+    except Exception:
+        return None
+
+
+class PipelineMetrics:
+    """Rollende Latenzen pro Pipeline-Stufe (ms) über die letzten ``window`` Äusserungen.
+
+    Stufen: queue_wait (Segment fertig -> Worker), model_wait (Modell lädt noch),
+    preprocess, inference, filter (Halluzinationen/Korrekturen), write (Tippen),
+    total (Segment fertig -> Text getippt).
+    """
+
+    STAGES = ("queue_wait", "model_wait", "preprocess", "inference", "filter", "write", "total")
+
+    def __init__(self, window=200):
+        self.window = window
+        self.lock = threading.Lock()
+        self.samples = {stage: deque(maxlen=window) for stage in self.STAGES}
+        self.utterances = 0
+        self.dropped = {}  # Grund -> Anzahl (no_speech, loop, compression, ...)
+
+    def record(self, stages, reason=None):
+        with self.lock:
+            self.utterances += 1
+            if reason:
+                self.dropped[reason] = self.dropped.get(reason, 0) + 1
+            for stage, value in stages.items():
+                if stage in self.samples and value is not None:
+                    self.samples[stage].append(value)
+
+    def summary(self):
+        with self.lock:
+            snapshot = {stage: list(values) for stage, values in self.samples.items()}
+            utterances = self.utterances
+            dropped = dict(self.dropped)
+        stages = {}
+        for stage, values in snapshot.items():
+            if not values: continue
+            p50, p95, p99 = np.percentile(np.asarray(values, dtype=np.float64), (50, 95, 99))
+            stages[stage] = {"p50": round(float(p50), 1), "p95": round(float(p95), 1),
+                             "p99": round(float(p99), 1), "n": len(values)}
+        return {"utterances": utterances, "window": self.window, "dropped": dropped, "stages": stages}
@@ -0,0 +1,176 @@
+import os
+import re
+import copy
+import json
+import time
+import shutil
+import platform
+import threading
+from pathlib import Path
+from core.config import ConfigManager
+from core.protocol import send_json
+
+_writing = set()  # tmp-Ordner, die dieser Prozess gerade schreibt (sweep lässt sie stehen)
+
+
+class ModelCache:
+    """Lokaler Cache mit bereits konvertierten Gewichten (safetensors).
+
+    Key = model_id + Revision (Commit-Hash auf dem Hub) + dtype + Gerätetyp,
+    ein aktualisiertes Modell bekommt also einen neuen Eintrag. Beim ersten Start wird das Modell
+    normal über den HF-Cache geladen und danach im Ziel-dtype gespeichert.
+    Spätere Starts laden direkt aus dem Cache: safetensors wird per mmap
+    gelesen, es gibt keine dtype-Konvertierung mehr und mehrere Prozesse
+    teilen sich den Page-Cache.
+    """
+
+    STALE_TMP_S = 6 * 3600  # halbe Einträge ohne prüfbare PID spätestens dann wegräumen
+
+    def __init__(self, root=None):
+        self.root = root or (ConfigManager.get_config_dir() / "model_cache")
+
+    @staticmethod
+    def key(model_id, torch_dtype, device, revision=None):
+        safe_id, suffix = ModelCache._key_parts(model_id, torch_dtype, device)
+        return f"{safe_id}-{(revision or 'local')[:12]}-{suffix}"
+
+    @staticmethod
+    def _key_parts(model_id, torch_dtype, device):
+        dtype = str(torch_dtype).replace("torch.", "")
+        device_type = "cuda" if "cuda" in str(device) else "cpu"
+        return re.sub(r"[^A-Za-z0-9._-]+", "--", model_id), f"{dtype}-{device_type}"
+
+    def path(self, model_id, torch_dtype, device, revision=None):
+        return self.root / self.key(model_id, torch_dtype, device, revision)
+
+    def has(self, model_id, torch_dtype, device, revision=None):
+        # Fertig ist ein Eintrag erst mit der Marker-Datei (wird nach dem Speichern geschrieben)
+        return (self.path(model_id, torch_dtype, device, revision) / "alpencode_cache.json").exists()
+
+    @staticmethod
+    def resolve_revision(model_id):
+        """Commit-Hash der aktuellen Modellversion: Hub (kurzes Timeout), offline der lokale HF-Cache.
+
+        None für lokale Modell-Ordner oder wenn nichts auflösbar ist.
+        """
+        if os.path.isdir(model_id):
+            return None
+        try:
+            from huggingface_hub import HfApi
+            return HfApi().model_info(model_id, timeout=3).sha
+        except Exception:
+            pass
+        try:
+            from huggingface_hub.constants import HF_HUB_CACHE
+            ref = Path(HF_HUB_CACHE) / ("models--" + model_id.replace("/", "--")) / "refs" / "main"
+            return ref.read_text().strip() or None
+        except Exception:
+            return None
+
+    @staticmethod
+    def source_matches(model_id, torch_dtype, revision=None):
+        """True, wenn der Checkpoint schon safetensors im Ziel-dtype ist: dann wird er ohnehin per
+        mmap geladen und nicht konvertiert, ein Cache-Eintrag wäre nur eine zweite Kopie der Gewichte."""
+        def find(name):
+            if os.path.isdir(model_id):
+                path = Path(model_id) / name
+                return path if path.exists() else None
+            try:
+                from huggingface_hub import try_to_load_from_cache
+                path = try_to_load_from_cache(model_id, name, revision=revision)
+                return Path(path) if isinstance(path, str) else None
+            except Exception:
+                return None
+
+        config = find("config.json")
+        if config is None or not (find("model.safetensors") or find("model.safetensors.index.json")):
+            return False
+        try:
+            source_dtype = json.loads(config.read_text(encoding="utf-8")).get("torch_dtype")
+        except Exception:
+            return False
+        return source_dtype == str(torch_dtype).replace("torch.", "")
+
+    def sweep(self):
+        """Entfernt halbe Einträge (*.tmp<pid>) von Prozessen, die beim Schreiben beendet wurden."""
+        if not self.root.exists():
+            return
+        for entry in self.root.iterdir():
+            match = re.search(r"\.tmp(\d+)$", entry.name)
+            if not match:
+                continue
+            try:
+                age = time.time() - entry.stat().st_mtime
+            except OSError:
+                continue
+            if str(entry) in _writing:
+                continue
+            if age > self.STALE_TMP_S or not self._pid_alive(int(match.group(1))):
+                shutil.rmtree(entry, ignore_errors=True)
+
+    @staticmethod
+    def _pid_alive(pid):
+        if pid == os.getpid():
+            return False  # nicht in _writing -> Rest eines früheren Prozesses mit gleicher PID
+        try:
+            import psutil
+            return psutil.pid_exists(pid)
+        except ImportError:
+            pass
+        if platform.system() == "Windows":
+            return True  # ohne psutil nicht prüfbar -> nur über das Alter aufräumen
+        try:
+            os.kill(pid, 0)
+            return True
+        except ProcessLookupError:
+            return False
+        except OSError:
+            return True
+
+    def _remove_old_revisions(self, model_id, torch_dtype, device, revision):
+        # Gleiches Modell/dtype/Gerät mit anderer (oder ohne, altes Format) Revision ist veraltet
+        keep = self.key(model_id, torch_dtype, device, revision)
+        safe_id, suffix = self._key_parts(model_id, torch_dtype, device)
+        stale = re.compile(re.escape(safe_id) + r"(-(?:[0-9a-f]{12}|local))?-" + re.escape(suffix))
+        for entry in self.root.iterdir():
+            if entry.name != keep and entry.is_dir() and stale.fullmatch(entry.name):
+                shutil.rmtree(entry, ignore_errors=True)
+
+    def store(self, parts, model_id, torch_dtype, device, revision=None):
+        model, tokenizer, feature_extractor, generation_config = parts
+        target = self.path(model_id, torch_dtype, device, revision)
+        tmp = target.with_name(target.name + f".tmp{os.getpid()}")
+        _writing.add(str(tmp))
+        try:
+            shutil.rmtree(tmp, ignore_errors=True)
+            tmp.mkdir(parents=True, exist_ok=True)
+            model.save_pretrained(tmp, safe_serialization=True)
+            if generation_config is not None:
+                # Stand beim Laden: compile_model setzt währenddessen cache_implementation="static" am Live-Objekt
+                generation_config.save_pretrained(tmp)
+            if tokenizer is not None:
+                tokenizer.save_pretrained(tmp)
+            if feature_extractor is not None:
+                feature_extractor.save_pretrained(tmp)
+            with open(tmp / "alpencode_cache.json", "w", encoding="utf-8") as f:
+                json.dump({"model_id": model_id, "revision": revision, "dtype": str(torch_dtype), "device": str(device)}, f)
+
+            if target.exists():
+                shutil.rmtree(target, ignore_errors=True)
+            os.replace(tmp, target)
+            self._remove_old_revisions(model_id, torch_dtype, device, revision)
+            return True
+        except Exception as e:
+            send_json({"type": "status", "message": f"⚠️ Model cache write failed: {e}"})
+            shutil.rmtree(tmp, ignore_errors=True)
+            return False
+        finally:
+            _writing.discard(str(tmp))
+
+    def store_async(self, pipe, model_id, torch_dtype, device, revision=None):
+        # Speichern im Hintergrund, die erste Transkription muss nicht darauf warten.
+        # Komponenten sofort festhalten: pipe.model wird bei int8 danach durch die quantisierte Kopie ersetzt,
+        # die Generation-Config wird kopiert, weil compile_model sie danach ändert.
+        generation_config = getattr(pipe.model, "generation_config", None)
+        parts = (pipe.model, pipe.tokenizer, pipe.feature_extractor, copy.deepcopy(generation_config))
+        threading.Thread(target=self.store, args=(parts, model_id, torch_dtype, device, revision), daemon=True).start()
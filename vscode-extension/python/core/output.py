@@ -0,0 +1,198 @@
+import platform
+import subprocess
+import threading
+from core.protocol import send_json
+try:
+    import pyautogui
+    PYAUTOGUI_AVAILABLE = True
+except ImportError:
+    PYAUTOGUI_AVAILABLE = False
+try:
+    import pyperclip
+    PYPERCLIP_AVAILABLE = True
+except ImportError:
+    PYPERCLIP_AVAILABLE = False
+
+
+class KeystrokeSink:
+    """Tippt den Text Zeichen für Zeichen (pyautogui). Funktioniert überall, dauert aber mit der Textlänge."""
+    name = "keystroke"
+
+    def __init__(self, sys_ctrl):
+        self.sys_ctrl = sys_ctrl
+
+    def write(self, text):
+        self.sys_ctrl.write(text)
+
+    def press_enter(self):
+        self.sys_ctrl.press_enter()
+
+
+class ClipboardSink(KeystrokeSink):
+    """Kopiert den Text in die Zwischenablage und fügt ihn mit einem Paste-Shortcut ein.
+
+    Konstante Latenz unabhängig von der Textlänge. Die vorherige Zwischenablage (nur Text)
+    wird nach RESTORE_DELAY wiederhergestellt, sofern seither niemand anderes kopiert hat.
+    Der Shortcut ist konfigurierbar (paste_hotkey), Linux-Terminals fügen z.B. nur mit
+    Ctrl+Shift+V ein. Ohne Clipboard-Zugriff wird getippt.
+    """
+    name = "clipboard"
+    # Zeit für die Ziel-App, die Zwischenablage nach dem Shortcut zu lesen
+    RESTORE_DELAY = 0.5
+
+    def __init__(self, sys_ctrl):
+        super().__init__(sys_ctrl)
+        self.os_name = platform.system()
+        self.paste_hotkey = ""
+        self._lock = threading.Lock()
+        self._saved = None
+        self._restore_timer = None
+
+    def hotkey_keys(self):
+        # "ctrl+shift+v" -> ["ctrl", "shift", "v"]; leer = Standard des Systems
+        keys = [k.strip().lower() for k in (self.paste_hotkey or "").split("+") if k.strip()]
+        return keys or ["command" if self.os_name == "Darwin" else "ctrl", "v"]
+
+    def write(self, text):
+        if not text: return
+        if PYAUTOGUI_AVAILABLE:
+            with self._lock:
+                # Läuft noch ein Restore, gehört die Zwischenablage schon uns: Original behalten
+                if self._restore_timer is not None:
+                    self._restore_timer.cancel()
+                    self._restore_timer = None
+                else:
+                    self._saved = self._paste()
+                if self._copy(text):
+                    try:
+                        pyautogui.hotkey(*self.hotkey_keys())
+                        self._schedule_restore(text)
+                        return
+                    except Exception as e:
+                        send_json({"type": "error", "message": f"Paste Error: {e}"})
+                self._saved = None
+        super().write(text)
+
+    def _schedule_restore(self, text):
+        if not self._saved:
+            return  # leer oder kein Text (z.B. Bild): nichts, was sich wiederherstellen liesse
+        self._restore_timer = threading.Timer(self.RESTORE_DELAY, self._restore, args=(text,))
+        self._restore_timer.daemon = True
+        self._restore_timer.start()
+
+    def _restore(self, text):
+        with self._lock:
+            # Inzwischen neu eingefügt (Timer schon abgebrochen): der neue Timer übernimmt
+            if self._restore_timer is not threading.current_thread():
+                return
+            self._restore_timer = None
+            saved, self._saved = self._saved, None
+            # Hat der Benutzer inzwischen selbst kopiert, nicht überschreiben
+            if saved and self._paste() == text:
+                self._copy(saved)
+
+    def _paste(self):
+        if PYPERCLIP_AVAILABLE:
+            try:
+                return pyperclip.paste()
+            except Exception:
+                pass
+        if self.os_name == "Darwin":
+            commands = [["pbpaste"]]
+        elif self.os_name == "Windows":
+            commands = [["powershell", "-NoProfile", "-Command",
+                         "[Console]::OutputEncoding=[Text.Encoding]::UTF8; Get-Clipboard -Raw"]]
+        else:
+            commands = [["wl-paste", "-n"], ["xclip", "-selection", "clipboard", "-o"], ["xsel", "-b", "-o"]]
+        for cmd in commands:
+            try:
+                result = subprocess.run(cmd, capture_output=True, timeout=2)
+                if result.returncode == 0:
+                    return result.stdout.decode("utf-8", errors="replace")
+            except (OSError, subprocess.SubprocessError):
+                continue
+        return None
+
+    def _copy(self, text):
+        if PYPERCLIP_AVAILABLE:
+            try:
+                pyperclip.copy(text)
+                return True
+            except Exception:
+                pass
+        # Ohne pyperclip: Bordmittel des Systems
+        if self.os_name == "Darwin":
+            commands = [(["pbcopy"], "utf-8")]
+        elif self.os_name == "Windows":
+            commands = [(["clip"], "utf-16")]  # clip.exe erkennt Unicode nur mit BOM (utf-16 schreibt ihn)
+        else:
+            commands = [(["wl-copy"], "utf-8"), (["xclip", "-selection", "clipboard"], "utf-8"), (["xsel", "-b", "-i"], "utf-8")]
+        for cmd, encoding in commands:
+            try:
+                if subprocess.run(cmd, input=text.encode(encoding), capture_output=True, timeout=2).returncode == 0:
+                    return True
+            except (OSError, subprocess.SubprocessError):
+                continue
+        return False
+
+
+class EditorSink:
+    """Schickt den Text an die Extension, die ihn mit einem einzigen TextEditor.edit einfügt.
+
+    Hat kein Editor den Fokus, schickt die Extension ihn als type_text zurück (Tastatur-Fallback).
+    Enter ist immer ein echter Tastendruck (press_enter), nie ein Zeilenumbruch im Dokument.
+    """
+    name = "editor"
+
+    def __init__(self, sys_ctrl):
+        self.sys_ctrl = sys_ctrl
+
+    def write(self, text):
+        if text: send_json({"type": "transcription", "text": text})
+
+    def press_enter(self):
+        send_json({"type": "transcription", "text": "", "enter": True})
+
+
+OUTPUT_SINKS = {
+    "editor": EditorSink,
+    "clipboard": ClipboardSink,
+    "keystroke": KeystrokeSink,
+}
+
+
+def register_sink(name, cls):
+    OUTPUT_SINKS[name] = cls
+
+
+def create_sink(mode, sys_ctrl):
+    return OUTPUT_SINKS.get(mode, KeystrokeSink)(sys_ctrl)
+
+
+class OutputRouter:
+    """Aktuelle Ausgabe (output_mode), wechselt live über den ConfigManager-Subscriber."""
+
+    def __init__(self, sys_ctrl, mode="keystroke", paste_hotkey=""):
+        self.sys_ctrl = sys_ctrl
+        self.paste_hotkey = paste_hotkey
+        self.sink = self._create(mode)
+
+    def _create(self, mode):
+        sink = create_sink(mode, self.sys_ctrl)
+        if hasattr(sink, "paste_hotkey"):
+            sink.paste_hotkey = self.paste_hotkey
+        return sink
+
+    def write(self, text):
+        self.sink.write(text)
+
+    def press_enter(self):
+        self.sink.press_enter()
+
+    def on_config_changed(self, changed):
+        if 'paste_hotkey' in changed:
+            self.paste_hotkey = changed['paste_hotkey']
+            if hasattr(self.sink, "paste_hotkey"):
+                self.sink.paste_hotkey = self.paste_hotkey
+        if 'output_mode' in changed and changed['output_mode'] != self.sink.name:
+            self.sink = self._create(changed['output_mode'])
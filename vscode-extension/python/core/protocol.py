@@ -0,0 +1,137 @@
+import sys
+import json
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+PROTOCOL_VERSION = 1
+
+_stdout_lock = threading.Lock()
+
+
+def send_json(data, ensure_ascii=True):
+    # Einziger Weg auf stdout (alle Module): eine Zeile pro Nachricht, in einem write, nie verschachtelt
+    line = json.dumps(data, ensure_ascii=ensure_ascii) + "\n"
+    with _stdout_lock:
+        sys.stdout.write(line)
+        sys.stdout.flush()
+
+
+class Request:
+    """Ein eingehender Befehl, entweder als JSON-Frame oder als alte Textzeile."""
+    __slots__ = ("id", "method", "params", "framed")
+
+    def __init__(self, method, params=None, id=None, framed=False):
+        self.method = method
+        self.params = params or {}
+        self.id = id
+        self.framed = framed
+
+
+def parse_line(line, legacy_params=None):
+    """Framed: {"v": 1, "id": 7, "method": "start", "params": {...}}
+    Legacy: "set_config_val silence_threshold 4.5" (ohne Antwort, wie bisher).
+    """
+    line = line.strip()
+    if not line:
+        return None
+    if line.startswith("{"):
+        msg = json.loads(line)
+        return Request(msg.get("method"), msg.get("params"), msg.get("id"), framed=True)
+
+    parts = line.split(" ", 1)
+    cmd = parts[0]
+    arg = parts[1] if len(parts) > 1 else None
+    adapter = (legacy_params or {}).get(cmd)
+    return Request(cmd, adapter(arg) if adapter else {}, framed=False)
+
+
+class Dispatcher:
+    """asyncio Dispatcher für die stdin-Befehle.
+
+    Schnelle Befehle (start/stop, Config) laufen direkt im Event-Loop.
+    Langsame Befehle (Kalibrierung, Geräteliste) laufen in einem eigenen
+    Worker-Thread, damit ein push-to-talk ``stop`` nie hinter ihnen wartet.
+    Langsame Befehle werden untereinander serialisiert. Minutenlange Befehle
+    (``background=True``, z.B. autotune) bekommen einen eigenen Thread, damit
+    sie die übrigen langsamen Befehle nicht blockieren.
+    """
+
+    def __init__(self):
+        self.handlers = {}
+        self.slow = set()
+        self.background = set()
+        self.legacy_params = {}
+        self.running = True
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-cmd")
+
+    def register(self, name, handler, slow=False, legacy=None, background=False):
+        self.handlers[name] = handler
+        if slow:
+            self.slow.add(name)
+        if background:
+            self.background.add(name)
+        if legacy is not None:
+            self.legacy_params[name] = legacy
+
+    def stop(self):
+        self.running = False
+
+    def run(self):
+        asyncio.run(self._serve())
+
+    async def _serve(self):
+        loop = asyncio.get_running_loop()
+        lines = asyncio.Queue()
+        threading.Thread(target=self._read_stdin, args=(loop, lines), daemon=True).start()
+
+        while self.running:
+            line = await lines.get()
+            if line is None:
+                break
+            try:
+                request = parse_line(line, self.legacy_params)
+            except Exception as e:
+                send_json({"type": "error", "message": f"Protocol Error: {e}"})
+                continue
+            if request is None:
+                continue
+
+            if request.method in self.background:
+                threading.Thread(target=self._handle, args=(request,), daemon=True).start()
+            elif request.method in self.slow:
+                loop.run_in_executor(self.executor, self._handle, request)
+            else:
+                self._handle(request)
+
+        self.executor.shutdown(wait=False)
+
+    def _read_stdin(self, loop, lines):
+        for line in sys.stdin:
+            loop.call_soon_threadsafe(lines.put_nowait, line)
+        loop.call_soon_threadsafe(lines.put_nowait, None)
+
+    def _handle(self, request):
+        handler = self.handlers.get(request.method)
+        if handler is None:
+            if request.framed:
+                self._reply(request, error=f"Unknown method: {request.method}")
+            return
+        try:
+            result = handler(request.params)
+            self._reply(request, result=result)
+        except Exception as e:
+            send_json({"type": "error", "message": str(e)})
+            self._reply(request, error=str(e))
+
+    @staticmethod
+    def _reply(request, result=None, error=None):
+        # Nur Frames mit id bekommen eine Antwort, Legacy-Zeilen bleiben stumm
+        if not request.framed or request.id is None:
+            return
+        msg = {"type": "response", "v": PROTOCOL_VERSION, "id": request.id}
+        if error is not None:
+            msg["error"] = error
+        else:
+            msg["result"] = result
+        send_json(msg)
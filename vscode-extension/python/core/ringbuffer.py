@@ -0,0 +1,64 @@
+import numpy as np
+
+
+class AudioRingBuffer:
+    """Vorallokierter int16 Puffer für die Aufnahme.
+
+    Der Puffer hält nur das aktuelle, noch nicht abgegebene Segment
+    (``start`` bis ``end``). ``append`` kopiert den Chunk in den freien Platz,
+    ``cut`` gibt einen Numpy-View ohne Kopie zurück. Läuft der Platz aus,
+    wird der offene Rest an den Anfang eines neuen Blocks kopiert, damit
+    bereits in die Queue gelegte Views gültig bleiben. Geschrieben wird nie
+    vor ``end``, auch nicht nach ``clear``.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = int(capacity)
+        self.buf = np.zeros(self.capacity, dtype=np.int16)
+        self.start = 0
+        self.end = 0
+
+    def __len__(self):
+        return self.end - self.start
+
+    def append(self, data):
+        samples = data if isinstance(data, np.ndarray) else np.frombuffer(data, dtype=np.int16)
+        n = len(samples)
+        if self.end + n > self.capacity:
+            self._wrap(n)
+        self.buf[self.end:self.end + n] = samples
+        self.end += n
+        return samples
+
+    def keep_last(self, n_samples):
+        # Pre-Roll: nur die letzten n Samples behalten (O(1), nur Index verschieben)
+        self.start = max(self.start, self.end - int(n_samples))
+
+    def peek(self):
+        # View auf das offene Segment, ohne es abzugeben (für Live-Partials)
+        view = self.buf[self.start:self.end]
+        view.flags.writeable = False
+        return view
+
+    def cut(self, n_samples=None):
+        # Gibt die ersten n Samples des offenen Segments als View zurück
+        n = len(self) if n_samples is None else min(int(n_samples), len(self))
+        view = self.buf[self.start:self.start + n]
+        view.flags.writeable = False
+        self.start += n
+        return view
+
+    def clear(self):
+        # Nicht zurückspulen: Segmente in der Queue sind Views auf diesen Speicher.
+        # Nur das offene Segment verwerfen, neuer Speicher kommt erst mit _wrap.
+        self.start = self.end
+
+    def _wrap(self, incoming):
+        pending = len(self)
+        if pending + incoming > self.capacity:
+            raise OverflowError("AudioRingBuffer capacity exceeded")
+        new_buf = np.empty(self.capacity, dtype=np.int16)
+        new_buf[:pending] = self.buf[self.start:self.end]
+        self.buf = new_buf
+        self.start = 0
+        self.end = pending
@@ -0,0 +1,68 @@
+import re
+
+_NORMALIZE = re.compile(r"[^\w]+", re.UNICODE)
+
+
+class LocalAgreement:
+    """Local-Agreement Commit für Live-Partials.
+
+    Jede neue Hypothese des wachsenden Fensters wird mit der vorherigen
+    verglichen. Nur das gemeinsame Wort-Präfix gilt als stabil und wird
+    committed (getippt). Getippter Text kann nicht zurückgenommen werden,
+    deshalb wächst ``committed`` nur.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.committed = []
+        self.previous = []
+
+    @property
+    def active(self):
+        return bool(self.committed or self.previous)
+
+    @property
+    def text(self):
+        return " ".join(self.committed)
+
+    @staticmethod
+    def _key(word):
+        # Vergleich ohne Satzzeichen/Gross-Klein, Whisper schwankt dort zwischen Hypothesen
+        return _NORMALIZE.sub("", word).lower()
+
+    def update(self, hypothesis):
+        """Nimmt eine neue Hypothese, gibt den neu stabilen Text zurück ('' wenn nichts neu)."""
+        words = hypothesis.split() if hypothesis else []
+        stable = 0
+        for a, b in zip(self.previous, words):
+            if self._key(a) != self._key(b):
+                break
+            stable += 1
+        self.previous = words
+
+        n = len(self.committed)
+        if stable <= n:
+            return ""
+        # Die Hypothese muss zum bereits getippten Text passen, sonst nichts committen
+        if [self._key(w) for w in words[:n]] != [self._key(w) for w in self.committed]:
+            return ""
+        new_words = words[n:stable]
+        self.committed.extend(new_words)
+        return " ".join(new_words)
+
+    def finalize(self, final_text):
+        """Finale Transkription des Segments: gibt den noch nicht getippten Rest zurück."""
+        words = final_text.split() if final_text else []
+        n = len(self.committed)
+        rest = words[n:]
+        keys = [self._key(w) for w in words]
+        if n and keys[:n] != [self._key(w) for w in self.committed]:
+            # Finale Version weicht ab: nach dem letzten getippten Wort weitermachen
+            last = self._key(self.committed[-1])
+            hits = [i for i, k in enumerate(keys[:n + 3]) if k == last]
+            if hits:
+                rest = words[hits[-1] + 1:]
+        self.reset()
+        return " ".join(rest)
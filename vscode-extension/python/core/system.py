@@ -1,17 +1,116 @@
 import platform
 import subprocess
+import shutil
+import queue
+import threading
 import re
-import json
+from core.protocol import send_json
 try:
     import pyautogui
     PYAUTOGUI_AVAILABLE = True
 except ImportError:
     PYAUTOGUI_AVAILABLE = False
 
-class SystemController:
+class VolumeController:
+    """Mute/Unmute in einem eigenen Hintergrund-Thread.
+
+    Das Backend (amixer, pactl, pycaw) wird einmal beim Start erkannt und gemerkt,
+    danach kostet ein Aufruf nur noch einen Prozess-Start im Worker. start/stop und
+    die "ready" Nachricht warten nie auf die Lautstärke.
+    """
+
     def __init__(self):
+        self.os_name = platform.system()
+        self.backend = None
         self.original_volume = None
+        self.actions = queue.Queue()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def mute(self):
+        self.actions.put("mute")
+
+    def unmute(self):
+        self.actions.put("unmute")
+
+    def _run(self):
+        self.backend = self._detect_backend()
+        while True:
+            action = self.actions.get()
+            # Nur der letzte Wunsch zählt (schnelles start/stop -> ein einziger Aufruf)
+            while not self.actions.empty():
+                action = self.actions.get_nowait()
+            if self.backend is None: continue
+            try:
+                if action == "mute":
+                    self._mute()
+                else:
+                    self._unmute()
+            except Exception as e:
+                send_json({"type": "error", "message": f"Volume Error ({action}): {e}"})
+
+    def _mute(self):
+        if self.original_volume is None:
+            self.original_volume = self._get_volume()
+            if self.original_volume is None:
+                self.original_volume = 50
+        self._set_volume(0)
+
+    def _unmute(self):
+        if self.original_volume is not None:
+            self._set_volume(self.original_volume)
+            self.original_volume = None
+
+    def _detect_backend(self):
+        if self.os_name == "Linux":
+            # amixer (ALSA) zuerst, sonst pactl (PulseAudio/PipeWire)
+            if shutil.which("amixer"):
+                try:
+                    if subprocess.run(['amixer', 'get', 'Master'], capture_output=True).returncode == 0:
+                        return "amixer"
+                except OSError:
+                    pass
+            if shutil.which("pactl"):
+                return "pactl"
+        elif self.os_name == "Windows":
+            try:
+                # COM muss pro Thread initialisiert werden, pycaw läuft hier im Worker
+                import comtypes
+                comtypes.CoInitialize()
+                from pycaw.pycaw import AudioUtilities, IAudioEndpointVolume
+                devices = AudioUtilities.GetSpeakers()
+                interface = devices.Activate(IAudioEndpointVolume._iid_, 0, None)
+                self._endpoint = interface.QueryInterface(IAudioEndpointVolume)
+                return "pycaw"
+            except Exception:
+                pass
+        return None
+
+    def _get_volume(self):
+        if self.backend == "amixer":
+            result = subprocess.run(['amixer', 'get', 'Master'], capture_output=True, text=True)
+            match = re.search(r'\[(\d+)%\]', result.stdout)
+            if match: return int(match.group(1))
+        elif self.backend == "pactl":
+            result = subprocess.run(['pactl', 'get-sink-volume', '@DEFAULT_SINK@'], capture_output=True, text=True)
+            match = re.search(r'/\s*(\d+)%', result.stdout)
+            if match: return int(match.group(1))
+        elif self.backend == "pycaw":
+            return int(self._endpoint.GetMasterVolumeLevelScalar() * 100)
+        return None
+
+    def _set_volume(self, volume_percent):
+        if self.backend == "amixer":
+            subprocess.run(['amixer', 'set', 'Master', f'{volume_percent}%'], capture_output=True)
+        elif self.backend == "pactl":
+            subprocess.run(['pactl', 'set-sink-volume', '@DEFAULT_SINK@', f'{volume_percent}%'], capture_output=True)
+        elif self.backend == "pycaw":
+            self._endpoint.SetMasterVolumeLevelScalar(volume_percent / 100.0, None)
+
+
+class SystemController:
+    def __init__(self):
         self.os_name = platform.system()
+        self.volume = VolumeController()
 
     def press_enter(self):
         if PYAUTOGUI_AVAILABLE:
@@ -20,77 +119,14 @@ class SystemController:
             except Exception as e:
                 pass
         else:
-            print(json.dumps({"type": "error", "message": "pyautogui missing."}))
+            send_json({"type": "error", "message": "pyautogui missing."})
 
     def mute(self):
-        try:
-            if self.original_volume is None:
-                self.original_volume = self._get_volume()
-                if self.original_volume is None:
-                    self.original_volume = 50
-            self._set_volume(0)
-        except Exception as e:
-            print(json.dumps({"type": "error", "message": f"Mute Error: {e}"}))
+        # Asynchron: kehrt sofort zurück, die Aufnahme startet ohne Verzögerung
+        self.volume.mute()
 
     def unmute(self):
-        try:
-            if self.original_volume is not None:
-                self._set_volume(self.original_volume)
-                self.original_volume = None
-        except Exception as e:
-            print(json.dumps({"type": "error", "message": f"Unmute Error: {e}"}))
-
-    def _get_volume(self):
-        try:
-            if self.os_name == "Linux":
-                # Versuche zuerst amixer
-                result = subprocess.run(['amixer', 'get', 'Master'], capture_output=True, text=True)
-                if result.returncode == 0:
-                    match = re.search(r'\[(\d+)%\]', result.stdout)
-                    if match: return int(match.group(1))
-                
-                # Fallback zu pactl
-                result = subprocess.run(['pactl', 'get-sink-volume', '@DEFAULT_SINK@'], 
-                                      capture_output=True, text=True)
-                if result.returncode == 0:
-                    match = re.search(r'/  (\d+)%', result.stdout)
-                    if match: return int(match.group(1))
-
-            elif self.os_name == "Windows":
-                try:
-                    from pycaw.pycaw import AudioUtilities, IAudioEndpointVolume
-                    devices = AudioUtilities.GetSpeakers()
-                    interface = devices.Activate(IAudioEndpointVolume._iid_, 0, None)
-                    volume = interface.QueryInterface(IAudioEndpointVolume)
-                    return int(volume.GetMasterVolumeLevelScalar() * 100)
-                except ImportError:
-                    pass
-        except:
-            pass
-        return None
-
-    def _set_volume(self, volume_percent):
-        try:
-            if self.os_name == "Linux":
-                # Versuche zuerst amixer (ALSA)
-                result = subprocess.run(['amixer', 'set', 'Master', f'{volume_percent}%'], capture_output=True)
-                if result.returncode == 0: return
-                
-                # Fallback zu pactl
-                subprocess.run(['pactl', 'set-sink-volume', '@DEFAULT_SINK@', f'{volume_percent}%'], 
-                             capture_output=True)
-
-            elif self.os_name == "Windows":
-                try:
-                    from pycaw.pycaw import AudioUtilities, IAudioEndpointVolume
-                    devices = AudioUtilities.GetSpeakers()
-                    interface = devices.Activate(IAudioEndpointVolume._iid_, 0, None)
-                    volume = interface.QueryInterface(IAudioEndpointVolume)
-                    volume.SetMasterVolumeLevelScalar(volume_percent / 100.0, None)
-                except ImportError:
-                    pass
-        except:
-            pass
+        self.volume.unmute()
 
     def write(self, text):
         """Simuliert Tastaturanschläge (funktioniert überall: Chat, Terminal, Browser)"""
@@ -98,6 +134,6 @@ class SystemController:
             try:
                 pyautogui.write(text, interval=0.005)
             except Exception as e:
-                print(json.dumps({"type": "error", "message": f"Typing Error: {e}"}))
+                send_json({"type": "error", "message": f"Typing Error: {e}"})
         else:
-            print(json.dumps({"type": "error", "message": "pyautogui missing."}))
\ No newline at end of file
+            send_json({"type": "error", "message": "pyautogui missing."})
\ No newline at end of file
@@ -1,118 +1,516 @@
-import torch
-from transformers import pipeline
 import numpy as np
-import re
-from scipy.io import wavfile
-import json
+import gc
 import sys
+import time
+import threading
+from core.vad import create_vad
+from core.hallucination import HallucinationDetector
+from core.vocabulary import Vocabulary
+from core.model_cache import ModelCache
+from core.metrics import now, ms, process_rss_mb
+from core.protocol import send_json
+
+# torch / transformers / scipy werden erst beim Laden importiert (lazy), damit main.py
+# sofort Befehle annimmt und die Aufnahme starten kann, während das Modell lädt.
 
 class SwissTranscriber:
-    def __init__(self, model_id):
+    SAMPLE_RATE = 16000
+
+    PRECISIONS = ("auto", "fp32", "bf16", "int8")
+    # Feste max_new_tokens Buckets für den kompilierten Decoder (Whisper max. 448 inkl. Prompt)
+    COMPILE_TOKEN_BUCKETS = (64, 128, 256, 440)
+    TOKENS_PER_SECOND = 6
+    # Generierungs-Policy: erst ab LONG_FORM_S Chunking + Timestamps + Wiederholungs-Parameter,
+    # kürzere Segmente (typisches Diktat) dekodieren höchstens MAX_TOKENS_PER_SECOND pro Sekunde Audio
+    LONG_FORM_S = 30
+    CHUNK_LENGTH_S = 30
+    MAX_TOKENS_PER_SECOND = 10
+    MIN_NEW_TOKENS_BOUND = 16
+
+    def __init__(self, model_id, vad_config=None, precision="auto", compile_model=False, use_model_cache=True, threads=0):
+        self.model_id = model_id
+        self.threads = int(threads or 0)  # torch Intra-Op Threads, 0 = torch Default
+        self.use_model_cache = use_model_cache
+        self.load_timings = {}
+        self.vad_config = vad_config or {}
+        self.vad = None
+        self.precision = precision if precision in self.PRECISIONS else "auto"
+        self.compile_on_load = compile_model
+        self.compiled = False
+        self._eager_forward = None
+        self.pipe = None
+        self.device = None
+        self.torch_dtype = None
+        self.ready = threading.Event()
+        self.load_error = None
+        self.load_seconds = None
+        self.weights_mb = None
+        self.last_timings = {}  # Stufen-Latenzen (ms) des letzten transcribe_batch Aufrufs
+        self.last_reasons = []  # Grund pro verworfenem Segment (no_speech, cancelled, loop, ...)
+        self.hallucination = HallucinationDetector.from_config(self.vad_config)
+        self.vocabulary = Vocabulary.from_config(self.vad_config)
+        self.trim_silence = bool(self.vad_config.get('trim_silence', True))
+        self.trim_guard_ms = int(self.vad_config.get('trim_guard_ms', 150))
+        self.trim_max_pause_ms = int(self.vad_config.get('trim_max_pause_ms', 400))
+        self._cancel_lock = threading.Lock()
+        self.cancel_epoch = 0
+        self.preempt_epoch = 0
+        # Idle-Entladung: active = laufende transcribe_batch Aufrufe, last_used = letzte Nutzung
+        self._state_lock = threading.Lock()
+        self.loading = False
+        self.active = 0
+        self.last_used = now()
+        self.unloads = 0
+        self.reloads = 0
+        self.last_unload_ms = None
+        self.last_reload_s = None
+        self._on_ready = None
+        self._on_error = None
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            config['model_id'],
+            vad_config=config,
+            precision=config.get('inference_precision', 'auto'),
+            compile_model=config.get('compile_model', False),
+            use_model_cache=config.get('model_cache', True),
+            threads=config.get('torch_threads', 0)
+        )
+
+    def start_loading(self, on_ready=None, on_error=None):
+        """Lädt das Modell im Hintergrund; transcribe() wartet bis es bereit ist.
+
+        Die Callbacks werden gemerkt und auch beim Neuladen nach einer Idle-Entladung aufgerufen.
+        """
+        if on_ready or on_error:
+            self._on_ready, self._on_error = on_ready, on_error
+        with self._state_lock:
+            if self.loading or self.pipe is not None: return
+            self.loading = True
+            self.load_error = None
+            self.ready.clear()
+        reload = self.unloads > 0
+
+        def run():
+            try:
+                self.load()
+            except Exception as e:
+                self.load_error = e
+                self.ready.set()
+                if self._on_error: self._on_error(e)
+                return
+            finally:
+                with self._state_lock:
+                    self.loading = False
+                    self.last_used = now()
+            if reload:
+                self.last_reload_s = round(self.load_seconds, 2)
+                send_json({"type": "status", "message": f"✅ Model reloaded in {self.load_seconds:.1f}s"})
+            if self._on_ready: self._on_ready()
+        threading.Thread(target=run, daemon=True).start()
+
+    def ensure_loaded(self):
+        """Nach einer Idle-Entladung im Hintergrund neu laden (z.B. bei start), Audio wird solange gepuffert."""
+        self.last_used = now()
+        if self.pipe is None and self.unloads and not self.loading:
+            self.reloads += 1
+            send_json({"type": "status", "message": "🔄 Reloading model (unloaded while idle)..."})
+            self.start_loading()
+
+    def unload_if_idle(self, idle_s):
+        """Gibt Modell + CUDA Cache frei, wenn es idle_s Sekunden nicht benutzt wurde (0 = nie)."""
+        if not idle_s or idle_s <= 0 or self.pipe is None: return False
+        with self._state_lock:
+            if self.active or self.loading or now() - self.last_used < idle_s: return False
+            t0 = now()
+            rss_before = process_rss_mb()
+            self.ready.clear()
+            self.pipe = None
+            self.compiled = False
+            self._eager_forward = None
+            # Im Lock: ein gleichzeitiges ensure_loaded muss die Entladung sofort sehen
+            self.unloads += 1
+        self._release_memory()
+        self.last_unload_ms = ms(t0, now())
+        send_json({"type": "status", "message": f"💤 Model unloaded after {idle_s:.0f}s idle "
+                          f"({self.last_unload_ms:.0f} ms, RSS {rss_before} -> {process_rss_mb()} MB)"})
+        return True
+
+    def _release_memory(self):
+        gc.collect()
+        if self.device and "cuda" in self.device:
+            import torch
+            torch.cuda.empty_cache()
+        if sys.platform.startswith("linux"):
+            # glibc behält freigegebene kleine Blöcke im Heap -> an das OS zurückgeben
+            try:
+                import ctypes
+                ctypes.CDLL("libc.so.6").malloc_trim(0)
+            except Exception:
+                pass
+
+    def wait_ready(self, timeout=None):
+        self.ready.wait(timeout)
+        if self.load_error is not None:
+            raise RuntimeError(f"Model not available: {self.load_error}")
+        return self.pipe is not None
+
+    def load(self):
+        t0 = time.perf_counter()
+        import torch
+        self.load_timings = {"torch_import": time.perf_counter() - t0}
+        if self.threads > 0:
+            torch.set_num_threads(self.threads)
         # 1. Hardware Detection
         self.device = "cuda:0" if torch.cuda.is_available() else "cpu"
-        self.torch_dtype = torch.float16 if self.device == "cuda:0" else torch.float32
+        self.torch_dtype = self._resolve_dtype(self.device, self.precision)
         
-        print(json.dumps({"type": "status", "message": f"🚀 AI Init: Attempting to load on {self.device.upper()}..."}), flush=True)
+        send_json({"type": "status", "message": f"🚀 AI Init: Attempting to load on {self.device.upper()} ({self.precision})..."})
 
         try:
             # 2. Versuch: Pipeline auf GPU (oder CPU wenn keine Nvidia da ist) laden
-            self.pipe = pipeline(
-                "automatic-speech-recognition", 
-                model=model_id, 
-                device=self.device, 
-                torch_dtype=self.torch_dtype,
-                chunk_length_s=30
-            )
-            print(json.dumps({"type": "status", "message": f"✅ AI Loaded on {self.device.upper()}"}), flush=True)
+            self.pipe = self._load_pipeline(self.model_id)
+            send_json({"type": "status", "message": f"✅ AI Loaded on {self.device.upper()}"})
 
         except Exception as e:
             # 3. FALLBACK: Wenn GPU crasht (z.B. VRAM voll, falscher Treiber), auf CPU wechseln
             if "cuda" in self.device:
-                print(json.dumps({"type": "status", "message": f"⚠️ GPU Error ({str(e)}). Switching to CPU Mode..."}), flush=True)
+                send_json({"type": "status", "message": f"⚠️ GPU Error ({str(e)}). Switching to CPU Mode..."})
                 
                 self.device = "cpu"
-                self.torch_dtype = torch.float32
+                self.torch_dtype = self._resolve_dtype(self.device, self.precision)
                 
                 try:
-                    self.pipe = pipeline(
-                        "automatic-speech-recognition", 
-                        model=model_id, 
-                        device="cpu", 
-                        torch_dtype=torch.float32,
-                        chunk_length_s=30
-                    )
-                    print(json.dumps({"type": "status", "message": "✅ AI Loaded on CPU (Fallback)"}), flush=True)
+                    self.pipe = self._load_pipeline(self.model_id)
+                    send_json({"type": "status", "message": "✅ AI Loaded on CPU (Fallback)"})
                 except Exception as fatal_e:
-                    print(json.dumps({"type": "error", "message": f"Fatal AI Init Error: {fatal_e}"}), flush=True)
+                    send_json({"type": "error", "message": f"Fatal AI Init Error: {fatal_e}"})
                     raise fatal_e
             else:
                 # Wenn es schon auf CPU war und crasht, ist es ein echter Fehler
-                print(json.dumps({"type": "error", "message": f"AI Init Failed: {e}"}), flush=True)
+                send_json({"type": "error", "message": f"AI Init Failed: {e}"})
                 raise e
 
-    def transcribe(self, audio_bytes, save_path, silence_threshold=5):
-        # Bytes zu Int16 Array konvertieren
-        audio_data = np.frombuffer(audio_bytes, dtype=np.int16)
-        
-        # RMS (Lautstärke) berechnen
-        # 32768 ist der Max-Wert für 16bit Audio
-        rms = np.sqrt(np.mean(audio_data.astype(float)**2)) / 32768 * 100
-        
-        if np.isnan(rms): return None
-        
-        # Level an UI senden (optional)
-        # print(json.dumps({"type": "level", "value": int(rms), "threshold": silence_threshold}))
-        # sys.stdout.flush()
+        if self.compile_on_load:
+            t1 = time.perf_counter()
+            self.compile_model()
+            self.load_timings["compile"] = time.perf_counter() - t1
+        self.load_seconds = time.perf_counter() - t0
+        self.load_timings["total"] = self.load_seconds
+        send_json({"type": "status", "message": "⏱ Startup: " + ", ".join(
+            f"{k} {v:.1f}s" if isinstance(v, float) else f"{k} {v}" for k, v in self.load_timings.items())})
+        self.ready.set()
 
-        if rms < silence_threshold:
-            return None
-        
-        # WICHTIG: Samplerate muss zur AudioEngine passen (AudioEngine.RATE = 16000)
-        # Wenn hier 48000 steht, aber 16000 reinkommt, wird das Audio 3x zu schnell abgespielt.
-        wavfile.write(save_path, 16000, audio_data)
+    @staticmethod
+    def _resolve_dtype(device, precision):
+        import torch
+        # int8 wird nach dem Laden auf die Linear-Layer angewendet, geladen wird in fp32 (CPU) / fp16 (GPU)
+        if precision == "fp32": return torch.float32
+        if precision == "bf16": return torch.bfloat16
+        return torch.float16 if "cuda" in device else torch.float32
+
+    def _load_pipeline(self, model_id):
+        import torch
+        t0 = time.perf_counter()
+        from transformers import pipeline
+        self.load_timings["import"] = time.perf_counter() - t0
+
+        # Bereits konvertierte Gewichte aus dem lokalen Cache (safetensors, mmap) bevorzugen
+        cache = ModelCache() if self.use_model_cache else None
+        revision = None
+        if cache is not None:
+            cache.sweep()  # halbe Einträge abgebrochener Prozesse
+            revision = cache.resolve_revision(model_id)
+        cache_hit = cache is not None and cache.has(model_id, self.torch_dtype, self.device, revision)
+        source = str(cache.path(model_id, self.torch_dtype, self.device, revision)) if cache_hit else model_id
+
+        t0 = time.perf_counter()
+        # Bei einem Miss genau die Revision laden, unter der danach gecacht wird
+        pipe = pipeline(
+            "automatic-speech-recognition", 
+            model=source, 
+            device=self.device, 
+            torch_dtype=self.torch_dtype,
+            **({"revision": revision} if revision and not cache_hit else {})
+        )
+        self.load_timings["load"] = time.perf_counter() - t0
+        self.load_timings["cache"] = "hit" if cache_hit else ("miss" if cache else "off")
+
+        if cache is not None and not cache_hit:
+            if cache.source_matches(model_id, self.torch_dtype, revision):
+                # Nichts konvertiert (z.B. fp32 safetensors auf der CPU): keine zweite Kopie anlegen
+                self.load_timings["cache"] = "source"
+            else:
+                # Gespeichert wird die konvertierte Basis; int8 (dynamisch) lässt sich nicht als safetensors ablegen
+                cache.store_async(pipe, model_id, self.torch_dtype, self.device, revision)
+
+        self.load_timings["quantize"] = 0.0
+        if self.precision == "int8":
+            if self.device == "cpu":
+                # Dynamische int8 Quantisierung: Gewichte der Linear-Layer int8, Aktivierungen zur Laufzeit
+                t1 = time.perf_counter()
+                pipe.model = torch.quantization.quantize_dynamic(pipe.model, {torch.nn.Linear}, dtype=torch.qint8)
+                self.load_timings["quantize"] = time.perf_counter() - t1
+            else:
+                send_json({"type": "status", "message": "⚠️ int8 is CPU-only, using fp16 on GPU"})
+
+        self.weights_mb = self.model_size_mb(pipe.model)
+        send_json({"type": "status", "message": f"⏱ Model load {self.load_timings['load']:.1f}s (cache {self.load_timings['cache']}), "
+                          f"quantize {self.load_timings['quantize']:.1f}s, "
+                          f"weights {self.weights_mb:.0f} MB ({self.precision}, {str(self.torch_dtype).replace('torch.', '')})"})
+        return pipe
+
+    @staticmethod
+    def model_size_mb(model):
+        # Parameter + Buffer; quantisierte Linear-Layer halten ihre int8 Gewichte im state_dict
+        total = 0
+        for t in model.state_dict().values():
+            if hasattr(t, "element_size"):
+                total += t.numel() * t.element_size()
+        return total / (1024 * 1024)
+
+    def memory_stats(self):
+        stats = {"loaded": self.pipe is not None, "rss_mb": process_rss_mb(),
+                 "idle_s": round(now() - self.last_used, 1), "unloads": self.unloads, "reloads": self.reloads,
+                 "last_unload_ms": self.last_unload_ms, "last_reload_s": self.last_reload_s}
+        if self.weights_mb is not None:
+            stats["weights_mb"] = round(self.weights_mb, 1)
+        if self.device and "cuda" in self.device:
+            import torch
+            stats["cuda_allocated_mb"] = round(torch.cuda.memory_allocated() / (1024 * 1024), 1)
+            stats["cuda_reserved_mb"] = round(torch.cuda.memory_reserved() / (1024 * 1024), 1)
+        return stats
+
+    def cancel(self, preemptible_only=False):
+        """Bricht laufende Dekodierungen ab; greift zwischen zwei Decode-Schritten (StoppingCriteria).
+
+        preemptible_only=True trifft nur Aufrufe mit preemptible=True (z.B. Live-Partials).
+        """
+        with self._cancel_lock:
+            if preemptible_only:
+                self.preempt_epoch += 1
+            else:
+                self.cancel_epoch += 1
+
+    def _cancel_check(self, preemptible):
+        cancel_epoch, preempt_epoch = self.cancel_epoch, self.preempt_epoch
+        return lambda: self.cancel_epoch != cancel_epoch or (preemptible and self.preempt_epoch != preempt_epoch)
+
+    @staticmethod
+    def _stopping_criteria(is_cancelled):
+        from transformers import StoppingCriteria, StoppingCriteriaList
+
+        class CancelCriteria(StoppingCriteria):
+            def __call__(self, input_ids, scores, **kwargs):
+                return is_cancelled()
+
+        return StoppingCriteriaList([CancelCriteria()])
+
+    def transcribe(self, audio, save_path=None, silence_threshold=5, preemptible=False):
+        return self.transcribe_batch([audio], save_path, silence_threshold, preemptible)[0]
+
+    def transcribe_batch(self, audios, save_path=None, silence_threshold=5, preemptible=False):
+        """Transkribiert mehrere Segmente in einem Pipeline-Aufruf (batch_size = Anzahl Segmente).
+
+        Gibt eine Liste in gleicher Reihenfolge zurück, None für verworfene oder abgebrochene Segmente.
+        """
+        with self._state_lock:
+            self.active += 1
+        try:
+            self.ensure_loaded()
+            return self._transcribe_batch(audios, save_path, silence_threshold, preemptible)
+        finally:
+            with self._state_lock:
+                self.active -= 1
+                self.last_used = now()
+
+    def _transcribe_batch(self, audios, save_path, silence_threshold, preemptible):
+        is_cancelled = self._cancel_check(preemptible)
+        t0 = now()
+        self.wait_ready()
+        t1 = now()
+        timings = self.last_timings = {"model_wait": ms(t0, t1)}
+        results = [None] * len(audios)
+        reasons = self.last_reasons = ["no_speech"] * len(audios)
+        inputs, slots = [], []
+        for i, audio in enumerate(audios):
+            audio_float = self._prepare(audio, save_path, silence_threshold)
+            if audio_float is not None:
+                # WICHTIG: Samplerate muss zur AudioEngine passen (AudioEngine.RATE = 16000)
+                inputs.append({"raw": audio_float, "sampling_rate": self.SAMPLE_RATE})
+                slots.append(i)
+                reasons[i] = None
+        t2 = now()
+        timings["preprocess"] = ms(t1, t2)
+
+        if not inputs: return results
 
         try:
             # Transkription starten
-            result = self.pipe(
-                save_path, 
-                generate_kwargs={
-                    "language": "de", 
-                    "task": "transcribe",
-                    "return_timestamps": True,
-                    # Parameter gegen Wiederholungen
-                    "repetition_penalty": 1.2,
-                    "no_repeat_ngram_size": 3
-                }
-            )                   
-            
-            text = result['text'].strip() if isinstance(result, dict) else " ".join([c['text'] for c in result]).strip()
-
-            if self._is_hallucination(text):
-                return None
-
-            return self._replace_common_errors(text)
+            if is_cancelled(): return self._cancelled(results, slots)
+            longest_s = max(len(x["raw"]) for x in inputs) / self.SAMPLE_RATE
+            generate_kwargs = self._generate_kwargs(longest_s)
+            generate_kwargs["stopping_criteria"] = self._stopping_criteria(is_cancelled)
+            # Gemischte Längen im Batch: das längste Segment bestimmt die Policy
+            chunk_length_s = self.CHUNK_LENGTH_S if longest_s > self.LONG_FORM_S else None
+            outputs = self._run_pipe(inputs if len(inputs) > 1 else inputs[0], len(inputs), generate_kwargs, chunk_length_s)
+            if len(inputs) == 1: outputs = [outputs]
+            t3 = now()
+            timings["inference"] = ms(t2, t3)
+            # Abgebrochen: halbfertigen Text verwerfen
+            if is_cancelled(): return self._cancelled(results, slots)
 
+            for i, result in zip(slots, outputs):
+                results[i], reasons[i] = self._postprocess(result)
+            timings["filter"] = ms(t3, now())
+
+        except Exception as e:
+            send_json({"type": "error", "message": str(e)})
+            for i in slots:
+                if results[i] is None: reasons[i] = "error"
+
+        return results
+
+    def _cancelled(self, results, slots):
+        for i in slots: self.last_reasons[i] = "cancelled"
+        return results
+
+    def _generate_kwargs(self, duration_s):
+        kwargs = {
+            "language": "de", 
+            "task": "transcribe",
+        }
+        if duration_s > self.LONG_FORM_S:
+            # Long-Form (mit Chunking): Timestamps zum Zusammensetzen + Parameter gegen Wiederholungen
+            kwargs["return_timestamps"] = True
+            kwargs["repetition_penalty"] = 1.2
+            kwargs["no_repeat_ngram_size"] = 3
+            if self.compiled:
+                # Statischer Cache: max_new_tokens auf feste Buckets runden, damit keine Neukompilierung nötig ist
+                kwargs["max_new_tokens"] = self._token_bucket(duration_s * self.TOKENS_PER_SECOND)
+            return kwargs
+
+        # Kurz: keine Timestamp-Tokens, Schleifen begrenzt max_new_tokens (Rest fängt der Halluzinationsfilter)
+        tokens = self.MIN_NEW_TOKENS_BOUND + int(duration_s * self.MAX_TOKENS_PER_SECOND)
+        kwargs["max_new_tokens"] = self._token_bucket(tokens) if self.compiled else min(tokens, self.COMPILE_TOKEN_BUCKETS[-1])
+        return kwargs
+
+    def _token_bucket(self, tokens):
+        for bucket in self.COMPILE_TOKEN_BUCKETS:
+            if tokens <= bucket: return bucket
+        return self.COMPILE_TOKEN_BUCKETS[-1]
+
+    def _run_pipe(self, inputs, batch_size, generate_kwargs, chunk_length_s=None):
+        # chunk_length_s pro Aufruf: kurze Segmente ohne Chunking (ein Fenster, kein Stride-Overhead)
+        pipe_kwargs = {"chunk_length_s": chunk_length_s} if chunk_length_s else {}
+        if self.compiled:
+            # Statischer Cache ist nur für Batchgrösse 1 aufgewärmt, jede andere Grösse würde mitten im
+            # Diktat neu kompilieren -> Segmente im selben Pipeline-Aufruf einzeln dekodieren
+            batch_size = 1
+        try:
+            return self.pipe(inputs, batch_size=batch_size, generate_kwargs=generate_kwargs, **pipe_kwargs)
         except Exception as e:
-            print(json.dumps({"type": "error", "message": str(e)}), flush=True)
+            if not self.compiled: raise
+            # Kompilierter Pfad kaputt -> zurück auf Eager und nochmal versuchen
+            send_json({"type": "status", "message": f"⚠️ Compiled decode failed ({e}), switching to eager"})
+            self._disable_compile()
+            if "return_timestamps" in generate_kwargs:
+                generate_kwargs.pop("max_new_tokens", None)
+            return self.pipe(inputs, batch_size=batch_size, generate_kwargs=generate_kwargs, **pipe_kwargs)
+
+    def compile_model(self):
+        """Kompiliert den Decoder einmalig mit statischem KV-Cache (torch.compile) und wärmt alle Token-Buckets auf.
+
+        Bei Fehlern (alte torch/transformers Version, nicht unterstützte Ops) bleibt alles im Eager-Modus.
+        """
+        import torch
+        if not hasattr(torch, "compile"):
+            send_json({"type": "status", "message": "⚠️ torch.compile not available, staying eager"})
+            return False
+
+        model = self.pipe.model
+        self._eager_forward = model.forward
+        t0 = time.perf_counter()
+        try:
+            model.generation_config.cache_implementation = "static"
+            mode = "reduce-overhead" if "cuda" in self.device else "default"
+            model.forward = torch.compile(model.forward, mode=mode, fullgraph=True)
+            self.compiled = True
+
+            # Warmup: pro Bucket einmal generieren (Batchgrösse 1, siehe _run_pipe), danach sind alle Shapes im Cache
+            dummy = np.zeros(self.SAMPLE_RATE, dtype=np.float32)
+            for bucket in self.COMPILE_TOKEN_BUCKETS:
+                kwargs = self._generate_kwargs(0)
+                kwargs["max_new_tokens"] = bucket
+                self.pipe({"raw": dummy, "sampling_rate": self.SAMPLE_RATE}, generate_kwargs=kwargs)
+        except Exception as e:
+            send_json({"type": "status", "message": f"⚠️ Compile failed ({e}), staying eager"})
+            self._disable_compile()
+            return False
+
+        send_json({"type": "status", "message": f"✅ Decoder compiled (static cache) in {time.perf_counter() - t0:.1f}s"})
+        return True
+
+    def _disable_compile(self):
+        model = self.pipe.model
+        if self._eager_forward is not None:
+            model.forward = self._eager_forward
+        model.generation_config.cache_implementation = None
+        self.compiled = False
+
+    def _prepare(self, audio, save_path, silence_threshold):
+        # Audio kommt direkt aus der AudioEngine (int16 Bytes/Array oder float32), kein tmp.wav Umweg
+        audio_float = self._to_float32(audio)
+        if audio_float.size == 0: return None
+        
+        # Gleicher VAD wie in der AudioEngine: nur Segmente mit echter Sprache an Whisper geben
+        vad = self._get_vad(silence_threshold)
+        if self.trim_silence:
+            # Pre-Roll und Stille am Ende weg, lange Pausen gekürzt -> weniger Encoder/Decoder Arbeit
+            audio_float = vad.compact(audio_float, self.trim_guard_ms, self.trim_max_pause_ms)
+            if audio_float is None: return None
+        elif not vad.contains_speech(audio_float):
             return None
+        
+        # Debug-Modus: Segment zusätzlich als WAV ablegen (nur wenn save_path gesetzt ist)
+        if save_path:
+            try:
+                from scipy.io import wavfile
+                wavfile.write(save_path, self.SAMPLE_RATE, audio_float)
+            except Exception as e:
+                send_json({"type": "status", "message": f"Debug WAV Error: {e}"})
+        return audio_float
+
+    def _postprocess(self, result):
+        """Gibt (text, None) oder (None, grund) zurück."""
+        text = result['text'].strip() if isinstance(result, dict) else " ".join([c['text'] for c in result]).strip()
 
-    def _is_hallucination(self, text):
-        if not text: return True
-        # Filtert Text, der sich unnatürlich oft wiederholt (Whisper Bug)
-        if re.search(r'(.)\1{10,}', text): return True
-        if re.search(r'(.{5,})\1{2,}', text): return True
-        return False
+        reason = self.hallucination.check(text)
+        if reason:
+            return None, reason
+
+        return self._replace_common_errors(text), None
+
+    def _get_vad(self, silence_threshold):
+        if self.vad is None or self.vad.threshold != float(silence_threshold):
+            self.vad = create_vad(self.vad_config, silence_threshold, self.SAMPLE_RATE)
+        return self.vad
+
+    @staticmethod
+    def _to_float32(audio):
+        # int16 PCM -> float32 [-1, 1]; float32 Input wird ohne Kopie durchgereicht
+        if isinstance(audio, (bytes, bytearray, memoryview)):
+            audio = np.frombuffer(audio, dtype=np.int16)
+        audio = np.asarray(audio)
+        if audio.dtype == np.float32:
+            return audio
+        if audio.dtype == np.int16:
+            out = audio.astype(np.float32)
+            out *= 1.0 / 32768.0
+            return out
+        return audio.astype(np.float32)
 
     def _replace_common_errors(self, text):
-        # Typische Fehlerkorrekturen für Coding/Tech Begriffe
-        replacements = {
-            "PrideProject": "pyproject",
-            "MaxProject": "pyproject",
-            "Rimini": "README",
-            "Depensys": "Dependencies",
-            "Jason": "JSON",
-        }
-        for wrong, right in replacements.items():
-            # Case-Insensitive Replace wäre besser, aber simple reicht hier oft
-            text = text.replace(wrong, right)
-        return text
\ No newline at end of file
+        # Benutzer-/Workspace-Korrekturen, ein Regex-Durchlauf (im Daemon macht das der Client)
+        return self.vocabulary.apply(text) if self.vocabulary else text
@@ -0,0 +1,237 @@
+import numpy as np
+try:
+    import webrtcvad
+    WEBRTCVAD_AVAILABLE = True
+except ImportError:
+    WEBRTCVAD_AVAILABLE = False
+
+
+class VoiceActivityDetector:
+    """Frame-basierte Sprach-/Stille-Erkennung mit Hangover.
+
+    Unterklassen implementieren nur ``frame_decisions`` (ein bool pro Frame),
+    die Zustandslogik (min. Sprechdauer, Hangover, Stille-Zähler) liegt hier.
+    Audio kommt als int16 (AudioEngine) oder float32 in [-1, 1] (Transcriber).
+    """
+
+    def __init__(self, threshold=5, rate=16000, frame_ms=20, hangover_ms=200, min_speech_ms=60, min_silence_ms=100):
+        self.threshold = float(threshold)
+        self.rate = int(rate)
+        self.frame_ms = int(frame_ms)
+        self.frame_len = int(self.rate * self.frame_ms / 1000)
+        self.hangover_frames = max(0, int(round(hangover_ms / self.frame_ms)))
+        self.min_speech_frames = max(1, int(round(min_speech_ms / self.frame_ms)))
+        self.min_silence_frames = max(1, int(round(min_silence_ms / self.frame_ms)))
+        self.reset()
+
+    def reset(self):
+        self._rest = np.zeros(0, dtype=np.float32)
+        self._speech_run = 0
+        self._gap_run = 0
+        self._hang = 0
+        self.triggered = False
+        self.silence_frames = 0
+
+    @property
+    def silence_ms(self):
+        # Zeit seit dem letzten Sprach-Frame (bzw. seit reset())
+        return self.silence_frames * self.frame_ms
+
+    def frame_decisions(self, frames):
+        raise NotImplementedError
+
+    def process(self, samples):
+        """Verarbeitet einen Chunk, gibt True zurück wenn darin Sprache war."""
+        audio = np.concatenate((self._rest, self._to_float(samples)))
+        n = len(audio) // self.frame_len
+        self._rest = audio[n * self.frame_len:]
+        if n == 0:
+            return False
+
+        raw = self.frame_decisions(audio[:n * self.frame_len].reshape(n, self.frame_len))
+        speech_in_chunk = False
+        # Zustandsmaschine pro Frame; bei 20 ms Frames sind das nur ~13 Iterationen pro Chunk
+        for is_voice in raw:
+            if is_voice:
+                self._speech_run += 1
+                self._gap_run = 0
+                if self._speech_run >= self.min_speech_frames:
+                    self.triggered = True
+                    self._hang = self.hangover_frames
+            else:
+                self._gap_run += 1
+                # Kurze Lücken (< min_silence) unterbrechen den Sprach-Ansatz nicht
+                if self._gap_run >= self.min_silence_frames:
+                    self._speech_run = 0
+                if self._hang > 0:
+                    self._hang -= 1
+                elif self._gap_run >= self.min_silence_frames:
+                    self.triggered = False
+
+            if self.triggered and (is_voice or self._hang > 0):
+                speech_in_chunk = True
+                self.silence_frames = 0
+            else:
+                self.silence_frames += 1
+        return speech_in_chunk
+
+    def analyze(self, samples):
+        """Roh-Entscheidung pro Frame für ein ganzes Segment (ohne Zustand)."""
+        audio = self._to_float(samples)
+        n = len(audio) // self.frame_len
+        if n == 0:
+            return np.zeros(0, dtype=bool)
+        return np.asarray(self.frame_decisions(audio[:n * self.frame_len].reshape(n, self.frame_len)), dtype=bool)
+
+    def speech_mask(self, samples):
+        # Wie analyze(), aber mit Hangover (vektorisiert über eine laufende Summe)
+        raw = self.analyze(samples)
+        if self.hangover_frames == 0 or not raw.any():
+            return raw
+        return self._dilate(raw, self.hangover_frames, 0)
+
+    def contains_speech(self, samples):
+        return self._has_speech_run(self.analyze(samples))
+
+    def compact(self, samples, guard_ms=150, max_pause_ms=400):
+        """Schneidet Stille vorne/hinten ab und kürzt Pausen auf max_pause_ms.
+
+        Um jede Sprache (inkl. Hangover) bleibt guard_ms Rand stehen. Gibt float32
+        zurück, das Original wenn nichts wegfällt, None wenn keine Sprache drin ist.
+        """
+        audio = self._to_float(samples)
+        raw = self.analyze(audio)
+        if not self._has_speech_run(raw):
+            return None
+        guard = int(round(guard_ms / self.frame_ms))
+        keep = self._dilate(raw, self.hangover_frames + guard, guard)
+
+        # Pausen (False-Läufe zwischen Sprache): nur die ersten max_pause Frames behalten
+        max_pause = int(round(max_pause_ms / self.frame_ms))
+        first, last = np.flatnonzero(keep)[[0, -1]]
+        inner = np.zeros(len(keep), dtype=bool)
+        inner[first:last + 1] = True
+        gap = inner & ~keep
+        if gap.any():
+            idx = np.arange(len(keep))
+            run_start = np.maximum.accumulate(np.where(gap & ~np.concatenate(([False], gap[:-1])), idx, 0))
+            keep |= gap & (idx - run_start < max_pause)
+        keep &= inner
+        if keep.all():
+            return audio
+
+        # Frames -> Samples; der Rest nach dem letzten vollen Frame folgt dem letzten Frame
+        sample_keep = np.repeat(keep, self.frame_len)
+        tail = len(audio) - len(sample_keep)
+        if tail > 0:
+            sample_keep = np.concatenate((sample_keep, np.full(tail, keep[-1])))
+        return audio[sample_keep]
+
+    def _has_speech_run(self, raw):
+        # Mindestens min_speech Frames am Stück Sprache
+        raw = raw.astype(np.int32)
+        if len(raw) < self.min_speech_frames:
+            return False
+        run = np.convolve(raw, np.ones(self.min_speech_frames, dtype=np.int32), mode='valid')
+        return bool((run >= self.min_speech_frames).any())
+
+    @staticmethod
+    def _dilate(mask, back, ahead):
+        # Frame i bleibt, wenn innerhalb von `back` Frames davor oder `ahead` danach Sprache ist
+        n = len(mask)
+        csum = np.concatenate(([0], np.cumsum(mask)))
+        idx = np.arange(n)
+        return (csum[np.minimum(idx + ahead + 1, n)] - csum[np.maximum(idx - back, 0)]) > 0
+
+    @staticmethod
+    def _to_float(samples):
+        if isinstance(samples, (bytes, bytearray, memoryview)):
+            samples = np.frombuffer(samples, dtype=np.int16)
+        samples = np.asarray(samples)
+        if samples.dtype == np.int16:
+            out = samples.astype(np.float32)
+            out *= 1.0 / 32768.0
+            return out
+        return samples.astype(np.float32, copy=False)
+
+    @staticmethod
+    def frame_energy(frames):
+        # Gleiche 0-1000 Skala wie AudioEngine.calculate_rms, damit silence_threshold weiter passt
+        return np.sqrt(np.einsum('ij,ij->i', frames, frames) / frames.shape[1]) * 1000.0
+
+
+class RmsVAD(VoiceActivityDetector):
+    """Reine Energie-Schwelle (altes Verhalten, z.B. für die Kalibrierung)."""
+
+    def frame_decisions(self, frames):
+        return self.frame_energy(frames) > self.threshold
+
+
+class SpectralVAD(VoiceActivityDetector):
+    """Energie + Zero-Crossing-Rate + spektrale Flachheit.
+
+    Stimmhafte Frames brauchen nur die Energie-Schwelle, leisere stimmlose
+    Frames (s, sch, ch) werden über eine hohe ZCR zugelassen. Breitbandiges
+    Rauschen (Lüfter, Klicks) hat ein flaches Spektrum und wird verworfen.
+    """
+
+    def __init__(self, threshold=5, unvoiced_ratio=0.5, zcr_unvoiced=0.25, max_flatness=0.45, **kwargs):
+        super().__init__(threshold, **kwargs)
+        self.unvoiced_ratio = float(unvoiced_ratio)
+        self.zcr_unvoiced = float(zcr_unvoiced)
+        self.max_flatness = float(max_flatness)
+        self._window = np.hanning(self.frame_len).astype(np.float32)
+
+    def frame_decisions(self, frames):
+        energy = self.frame_energy(frames)
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / float(frames.shape[1] - 1)
+
+        power = np.abs(np.fft.rfft(frames * self._window, axis=1)) ** 2 + 1e-12
+        flatness = np.exp(np.mean(np.log(power), axis=1)) / np.mean(power, axis=1)
+
+        voiced = energy > self.threshold
+        unvoiced = (energy > self.threshold * self.unvoiced_ratio) & (zcr > self.zcr_unvoiced)
+        return (voiced | unvoiced) & (flatness < self.max_flatness)
+
+
+class WebRtcVAD(VoiceActivityDetector):
+    """Optionales Backend über das webrtcvad Paket (10/20/30 ms Frames)."""
+
+    def __init__(self, threshold=5, aggressiveness=2, **kwargs):
+        if kwargs.get('frame_ms', 20) not in (10, 20, 30):
+            kwargs['frame_ms'] = 20
+        super().__init__(threshold, **kwargs)
+        self._vad = webrtcvad.Vad(int(aggressiveness))
+
+    def frame_decisions(self, frames):
+        pcm = np.clip(frames * 32768.0, -32768, 32767).astype(np.int16)
+        energy = self.frame_energy(frames) > self.threshold
+        return np.array([self._vad.is_speech(f.tobytes(), self.rate) for f in pcm], dtype=bool) & energy
+
+
+VAD_BACKENDS = {
+    "energy": SpectralVAD,
+    "rms": RmsVAD,
+}
+if WEBRTCVAD_AVAILABLE:
+    VAD_BACKENDS["webrtc"] = WebRtcVAD
+
+
+def register_vad(name, cls):
+    VAD_BACKENDS[name] = cls
+
+
+def create_vad(config=None, threshold=5, rate=16000):
+    """Baut den VAD aus den vad_* Keys der Config (fehlende Keys -> Defaults)."""
+    config = config or {}
+    mode = config.get('vad_mode', 'energy')
+    cls = VAD_BACKENDS.get(mode, SpectralVAD)
+    return cls(
+        threshold,
+        rate=rate,
+        frame_ms=int(config.get('vad_frame_ms', 20)),
+        hangover_ms=int(config.get('vad_hangover_ms', 200)),
+        min_speech_ms=int(config.get('vad_min_speech_ms', 60)),
+        min_silence_ms=int(config.get('vad_min_silence_ms', 100)),
+    )
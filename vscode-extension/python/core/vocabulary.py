@@ -0,0 +1,133 @@
+import os
+import re
+import json
+import time
+import threading
+from pathlib import Path
+from core.config import ConfigManager
+from core.protocol import send_json
+
+# Typische Fehlerkorrekturen für Coding/Tech Begriffe (Basis, wird von Benutzer/Workspace überschrieben)
+BUILTIN_CORRECTIONS = {
+    "PrideProject": "pyproject",
+    "MaxProject": "pyproject",
+    "Rimini": "README",
+    "Depensys": "Dependencies",
+    "Jason": "JSON",
+}
+
+
+def trie_pattern(words):
+    """Regex aus einem Präfixbaum: pro Textposition höchstens ein Pfad durch den Baum
+    statt einer Alternative pro Eintrag. Längere Einträge haben Vorrang (gierig)."""
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = None
+
+    def build(node):
+        alts = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch != ""]
+        if not alts:
+            return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        if "" in node:
+            return "(?:" + body + ")?"
+        return body
+
+    return build(trie)
+
+
+class Vocabulary:
+    """Korrektur-Wörterbuch (falsch -> richtig), kompiliert in eine einzige Regex.
+
+    Quellen, spätere überschreiben frühere:
+    1. eingebaute Korrekturen
+    2. Benutzer: ``vocabulary_file`` oder <config_dir>/vocabulary.json
+    3. Workspace: <ALPENCODE_WORKSPACE>/.alpencode/vocabulary.json (von der Extension gesetzt)
+
+    Dateien sind JSON-Objekte {"falsch": "richtig"}. Geänderte Dateien werden beim
+    nächsten ``apply`` neu geladen (mtime, höchstens einmal pro Sekunde geprüft).
+    """
+
+    MTIME_CHECK_INTERVAL = 1.0
+
+    def __init__(self, paths=(), case_sensitive=False, whole_word=True):
+        self.paths = [Path(p) for p in paths if p]
+        self.case_sensitive = case_sensitive
+        self.whole_word = whole_word
+        self.lock = threading.Lock()
+        self.pattern = None
+        self.lookup = {}
+        self._mtimes = None
+        self._last_check = 0.0
+        self._reload()
+
+    @classmethod
+    def from_config(cls, config):
+        config = config or {}
+        user_file = config.get('vocabulary_file') or str(ConfigManager.get_config_dir() / "vocabulary.json")
+        paths = [user_file]
+        workspace = os.environ.get("ALPENCODE_WORKSPACE")
+        if workspace:
+            paths.append(os.path.join(workspace, ".alpencode", "vocabulary.json"))
+        return cls(
+            paths,
+            case_sensitive=bool(config.get('vocabulary_case_sensitive', False)),
+            whole_word=bool(config.get('vocabulary_whole_word', True)),
+        )
+
+    def _current_mtimes(self):
+        mtimes = []
+        for path in self.paths:
+            try:
+                mtimes.append(path.stat().st_mtime)
+            except OSError:
+                mtimes.append(None)
+        return mtimes
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now - self._last_check < self.MTIME_CHECK_INTERVAL:
+            return
+        self._last_check = now
+        if self._current_mtimes() != self._mtimes:
+            self._reload()
+
+    def _reload(self):
+        corrections = dict(BUILTIN_CORRECTIONS)
+        mtimes = self._current_mtimes()
+        for path, mtime in zip(self.paths, mtimes):
+            if mtime is None: continue
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                corrections.update({str(k): str(v) for k, v in data.items() if k})
+            except Exception as e:
+                send_json({"type": "status", "message": f"⚠️ Vocabulary Error ({path}): {e}"})
+        self.compile(corrections)
+        self._mtimes = mtimes
+
+    def compile(self, corrections):
+        fold = (lambda s: s) if self.case_sensitive else str.lower
+        lookup = {fold(wrong): right for wrong, right in corrections.items()}
+        pattern = None
+        if lookup:
+            body = trie_pattern(lookup)
+            if self.whole_word:
+                # Statt \b: funktioniert auch für Einträge, die mit Satzzeichen beginnen/enden
+                body = r"(?<!\w)" + body + r"(?!\w)"
+            pattern = re.compile(body, 0 if self.case_sensitive else re.IGNORECASE)
+        with self.lock:
+            self.lookup = lookup
+            self.pattern = pattern
+            self._fold = fold
+
+    def apply(self, text):
+        if not text: return text
+        self._maybe_reload()
+        with self.lock:
+            pattern, lookup, fold = self.pattern, self.lookup, self._fold
+        if pattern is None: return text
+        return pattern.sub(lambda m: lookup.get(fold(m.group(0)), m.group(0)), text)
@@ -4,54 +4,165 @@ import os
 import time
 import threading
 import queue
+import subprocess
+from collections import deque
+import numpy as np
 from core.config import ConfigManager
-from core.audio import AudioEngine
+from core.audio import AudioEngine, AudioSegment
 from core.system import SystemController
+from core.output import OutputRouter
+from core.vocabulary import Vocabulary
 from core.transcriber import SwissTranscriber
+from core.streaming import LocalAgreement
+from core.daemon import RemoteTranscriber, run_daemon
+from core.protocol import Dispatcher, PROTOCOL_VERSION, send_json
+from core.benchmark import run_benchmark
+from core.batch import run_batch
+from core.autotune import run_autotune
+from core.metrics import PipelineMetrics, now, ms
 
 worker_running = False
 
-def send_json(data):
-    print(json.dumps(data))
-    sys.stdout.flush()
+def collect_batch(audio_queue, first, pending, max_size, max_wait_s):
+    """Sammelt fertige finale Segmente hinter `first` (max. max_size, max. max_wait_s warten).
 
-def transcription_worker(audio_queue, transcriber, temp_file, silence_thresh, sys_ctrl, config_mgr):
+    Alles andere (Partials, CMD_STOP) beendet den Batch und landet in `pending`,
+    damit die Reihenfolge erhalten bleibt.
+    """
+    batch = [first]
+    deadline = time.monotonic() + max_wait_s
+    while len(batch) < max_size:
+        try:
+            timeout = deadline - time.monotonic()
+            item = audio_queue.get(timeout=timeout) if timeout > 0 else audio_queue.get_nowait()
+        except queue.Empty:
+            break
+        if isinstance(item, AudioSegment) and not item.partial and len(item) > 0:
+            batch.append(item)
+        else:
+            pending.append(item)
+            break
+    return batch
+
+def report_metrics(metrics, segment, started, timings, write_ms, done, text, batch_size, reason=None):
+    # Eine metrics-Nachricht pro Äusserung (finales Segment), Stufen in ms
+    stages = {"queue_wait": ms(segment.captured_at, started), **timings, "write": write_ms, "total": ms(segment.captured_at, done)}
+    metrics.record(stages, reason if not text else None)
+    send_json({
+        "type": "metrics",
+        "audio_ms": round(len(segment) * 1000 / AudioEngine.RATE),
+        "batch": batch_size,
+        "chars": len(text or ""),
+        "dropped": not text,
+        "reason": reason if not text else None,
+        "stages": stages
+    })
+
+def transcription_worker(audio_queue, transcriber, debug_file, sys_ctrl, config_mgr, metrics, output):
     global worker_running
     worker_running = True
+    agreement = LocalAgreement()
+    pending = deque()
+    held = []  # vorab dekodierte Teilstücke der gehaltenen push-to-talk Aufnahme (seg, started, timings, text, reason, batch)
+
+    def report_held(write_ms, done, reason=None):
+        # Gehaltene Teilstücke erst messen, wenn ihr Text wirklich geschrieben (oder verworfen) wurde
+        for seg, started, timings, text, seg_reason, batch_size in held:
+            report_metrics(metrics, seg, started, timings, write_ms, done, None if reason else text, batch_size, reason or seg_reason)
+        held.clear()
     
     while worker_running:
         try:
-            item = audio_queue.get(timeout=0.5)
+            item = pending.popleft() if pending else audio_queue.get(timeout=0.5)
             
-            # 1. TRANSCRIPTION
-            if isinstance(item, bytes) and len(item) > 0:
+            # 1. LIVE PARTIAL (wachsendes Fenster, nur stabiles Präfix wird getippt)
+            if isinstance(item, AudioSegment) and item.partial:
+                # Veraltet, wenn schon neueres Audio wartet -> überspringen
+                if audio_queue.empty() and not pending:
+                    try:
+                        silence_thresh = float(config_mgr.load().get('silence_threshold', 5.0))
+                        text = transcriber.transcribe(item.audio, None, silence_thresh, preemptible=True)
+                        if text:
+                            new_text = agreement.update(text)
+                            if new_text:
+                                output.write(new_text + " ")
+                            send_json({"type": "partial", "text": text, "committed": agreement.text})
+                    except Exception as e:
+                        send_json({"type": "status", "message": f"Partial Error: {e}"})
+
+            # 2. TRANSCRIPTION (wartende Segmente werden zu einem Batch zusammengefasst)
+            elif isinstance(item, AudioSegment) and len(item) > 0:
+                # Pro Batch aus der gecachten Config lesen, damit set_config_val sofort wirkt (auch für die Schwelle)
+                conf = config_mgr.load()
+                batch_max_size = max(1, int(conf.get('batch_max_size', 4)))
+                batch_max_wait_s = float(conf.get('batch_max_wait_ms', 0)) / 1000.0
+                silence_thresh = float(conf.get('silence_threshold', 5.0))
+                batch = collect_batch(audio_queue, item, pending, batch_max_size, batch_max_wait_s)
+                started = now()
                 try:
-                    text = transcriber.transcribe(item, temp_file, silence_thresh)
-                    if text and len(text) > 0:
-                        sys_ctrl.write(text + " ") 
+                    texts = transcriber.transcribe_batch([seg.audio for seg in batch], debug_file, silence_thresh)
+                    timings = transcriber.last_timings
+                    reasons = transcriber.last_reasons
+                    if agreement.active:
+                        texts[0] = agreement.finalize(texts[0])
+                    for seg, text, reason in zip(batch, texts, reasons):
+                        if seg.held:
+                            # Taste noch gedrückt: Text merken, ausgegeben wird beim Loslassen zusammen mit dem Rest
+                            if text:
+                                held.append((seg, started, timings, text, reason, len(batch)))
+                            else:
+                                report_metrics(metrics, seg, started, timings, 0.0, now(), text, len(batch), reason)
+                            continue
+                        out = " ".join([h[3] for h in held] + ([text] if text else []))
+                        t_write = now()
+                        if out:
+                            output.write(out + " ")
+                        done = now()
+                        report_held(ms(t_write, done), done)
+                        report_metrics(metrics, seg, started, timings, ms(t_write, done), done, text, len(batch), reason)
                 except Exception as e:
                     send_json({"type": "status", "message": f"Transcribe Error: {e}"})
+                for _ in batch[1:]: audio_queue.task_done()
 
-            # 2. STOP COMMAND
+            # 3. STOP COMMAND
             elif item == "CMD_STOP":
+                agreement.reset()
+                if held:
+                    # Letztes Stück ohne Sprache: nur die vorab dekodierten Teile ausgeben
+                    t_write = now()
+                    output.write(" ".join(h[3] for h in held) + " ")
+                    done = now()
+                    report_held(ms(t_write, done), done)
                 conf = config_mgr.load()
                 auto_enter = bool(conf.get('auto_enter_active', False))
                 
-                print(json.dumps({"type": "status", "message": f"⏹ Processing Stop. Auto-Enter: {auto_enter}"}), flush=True)
+                send_json({"type": "status", "message": f"⏹ Processing Stop. Auto-Enter: {auto_enter}"})
 
                 if auto_enter:
-                    sys_ctrl.press_enter()
-                    print(json.dumps({"type": "status", "message": "✅ ENTER PRESSED"}), flush=True)
+                    output.press_enter()
+                    send_json({"type": "status", "message": "✅ ENTER PRESSED"})
                 
                 sys_ctrl.unmute()
                 send_json({"type": "ready", "message": "Done"})
 
+            # 4. CANCEL (Aufnahme verworfen, nichts tippen) / PREEMPT (neue Aufnahme läuft schon)
+            elif item in ("CMD_CANCEL", "CMD_PREEMPT"):
+                agreement.reset()
+                pending.clear()
+                report_held(0.0, now(), "cancelled")
+                if item == "CMD_CANCEL":
+                    sys_ctrl.unmute()
+                    send_json({"type": "ready", "message": "Cancelled"})
+
             audio_queue.task_done()
             
         except queue.Empty:
             continue
         except Exception as e:
             send_json({"type": "error", "message": f"Worker Error: {e}"})
+            # Item trotzdem abschliessen, sonst bleibt unfinished_tasks hängen (on_model_ready)
+            try: audio_queue.task_done()
+            except ValueError: pass
 
 def main():
     global worker_running
@@ -64,155 +175,290 @@ def main():
         os.makedirs(config['save_folder'])
     
     sys_ctrl = SystemController()
+    # Ausgabe: "keystroke" (Tippen), "clipboard" (Paste) oder "editor" (ein Edit im aktiven VS Code Editor)
+    output = OutputRouter(sys_ctrl, config.get('output_mode', 'keystroke'), config.get('paste_hotkey', ''))
+    config_mgr.subscribe(output.on_config_changed)
     audio = AudioEngine()
+    config_mgr.subscribe(audio.on_config_changed)
     
     send_json({"type": "status", "message": f"Loading AI ({config['model_id']})..."})
     
-    try:
-        transcriber = SwissTranscriber(config['model_id'])
-        send_json({"type": "ready", "message": "Ready"})
-    except Exception as e:
+    if config.get('shared_daemon', False):
+        # Ein Modell für alle VS Code Fenster: Inferenz läuft im per-User Daemon
+        transcriber = RemoteTranscriber(os.path.abspath(__file__), Vocabulary.from_config(config))
+    else:
+        transcriber = SwissTranscriber.from_config(config)
+
+    def on_model_ready():
+        # Läuft eine Aufnahme oder warten noch Segmente/CMD_STOP (auch nach einem Idle-Reload),
+        # nicht auf "ready" zurücksetzen: das schickt CMD_STOP, wenn der Text geschrieben ist.
+        # unfinished_tasks zählt auch das Item, das der Worker gerade bearbeitet.
+        if audio.recording or audio.get_queue().unfinished_tasks:
+            send_json({"type": "status", "message": "✅ AI Ready (buffered audio is being processed)"})
+        else:
+            send_json({"type": "ready", "message": "Ready"})
+
+    def on_model_error(e):
         send_json({"type": "error", "message": f"AI Error: {e}"})
-        return
+        os._exit(1)
 
-    TEMP_FILE = os.path.join(config['save_folder'], "tmp.wav")
+    # Modell lädt im Hintergrund, Befehle (start/stop) werden sofort angenommen und Audio gepuffert
+    transcriber.start_loading(on_ready=on_model_ready, on_error=on_model_error)
+
+    def idle_watch():
+        # Modell nach model_idle_unload_s ohne Diktat freigeben (im Daemon macht das der Daemon selbst)
+        while True:
+            time.sleep(15)
+            idle_s = float(config_mgr.load().get('model_idle_unload_s', 0) or 0)
+            if idle_s > 0 and not audio.recording:
+                transcriber.unload_if_idle(idle_s)
+
+    threading.Thread(target=idle_watch, daemon=True).start()
+
+    # tmp.wav wird nur noch im Debug-Modus geschrieben, sonst geht das Audio direkt in die Pipeline
+    DEBUG_FILE = os.path.join(config['save_folder'], "tmp.wav") if config.get('debug_save_audio', False) else None
     worker_thread = None
+    metrics = PipelineMetrics()
+    calibrating = threading.Event()
+    autotune_lock = threading.Lock()
+    dispatcher = Dispatcher()
+
+    def cmd_start(params):
+        nonlocal worker_thread
+        global worker_running
+        if calibrating.is_set():
+            send_json({"type": "status", "message": "⚠️ Calibration running, start ignored"})
+            return {"recording": False}
+        if audio.monitoring: audio.stop_monitoring(); time.sleep(0.2)
+        
+        c = config_mgr.load()
+        # Nach Idle-Entladung sofort im Hintergrund neu laden, die Aufnahme läuft schon und wird gepuffert
+        transcriber.ensure_loaded()
+        # Veraltete Partials sofort abbrechen, optional auch die letzte finale Transkription
+        if c.get('preempt_on_start', False):
+            cancel_pending("CMD_PREEMPT")
+        else:
+            transcriber.cancel(preemptible_only=True)
+        sys_ctrl.mute()
+        
+        audio.start_recording(
+            c['device_index'], 
+            c['silence_threshold'],
+            streaming=bool(c.get('streaming_active', False)),
+            stream_pause_ms=int(c.get('stream_pause', 500)),
+            stop_pause_s=float(c.get('auto_stop_delay', 3.0)),
+            vad_config=c,
+            partial_interval_ms=int(c.get('partial_interval_ms', 600)) if c.get('live_partials', False) else 0,
+            predecode_pause_ms=int(c.get('predecode_pause_ms', 600))
+        )
+        
+        if worker_thread is None or not worker_thread.is_alive():
+            worker_running = True
+            worker_thread = threading.Thread(
+                target=transcription_worker,
+                args=(audio.get_queue(), transcriber, DEBUG_FILE, sys_ctrl, config_mgr, metrics, output),
+                daemon=True
+            )
+            worker_thread.start()
+        
+        send_json({"type": "status", "message": "Recording..."})
+        return {"recording": audio.recording}
+
+    def cmd_stop(params):
+        if calibrating.is_set():
+            return {"recording": False}
+        audio.stop_recording()
+        audio.get_queue().put("CMD_STOP")
+        send_json({"type": "status", "message": "Stopping..."})
+        return {"recording": False}
+
+    def cancel_pending(marker="CMD_CANCEL"):
+        audio.cancel_recording()
+        transcriber.cancel()
+        if worker_thread is not None and worker_thread.is_alive():
+            audio.get_queue().put(marker)
+        elif marker == "CMD_CANCEL":
+            sys_ctrl.unmute()
+            send_json({"type": "ready", "message": "Cancelled"})
 
-    while True:
+    def cmd_cancel(params):
+        cancel_pending()
+        send_json({"type": "status", "message": "Cancelling..."})
+        return {"recording": False}
+
+    # --- CONFIG HANDLER ---
+    def legacy_config_val(arg):
+        parts = (arg or "").strip().split(" ", 1)
+        return {"key": parts[0].strip(), "value": parts[1].strip()} if len(parts) == 2 else {}
+
+    def cmd_set_config_val(params):
         try:
-            line = sys.stdin.readline()
-            if not line: break
+            if "key" not in params: return None
+            key = params["key"]
+            raw_val = params["value"]
             
-            cmd_parts = line.strip().split(" ", 1)
-            cmd = cmd_parts[0]
-            arg = cmd_parts[1] if len(cmd_parts) > 1 else None
-
-            if cmd == "start":
-                if audio.monitoring: audio.stop_monitoring(); time.sleep(0.2)
-                sys_ctrl.mute()
-                
-                c = config_mgr.load()
-                
-                audio.start_recording(
-                    c['device_index'], 
-                    c['silence_threshold'],
-                    streaming=bool(c.get('streaming_active', False)),
-                    stream_pause_ms=int(c.get('stream_pause', 500)),
-                    stop_pause_s=float(c.get('auto_stop_delay', 3.0))
-                )
-                
-                if worker_thread is None or not worker_thread.is_alive():
-                    worker_running = True
-                    worker_thread = threading.Thread(
-                        target=transcription_worker,
-                        args=(audio.get_queue(), transcriber, TEMP_FILE, c['silence_threshold'], sys_ctrl, config_mgr),
-                        daemon=True
-                    )
-                    worker_thread.start()
-                
-                send_json({"type": "status", "message": "Recording..."})
+            # Typ aus dem Default ableiten (Frames können schon typisierte Werte schicken)
+            val = ConfigManager.coerce(key, raw_val)
             
-            elif cmd == "stop":
-                audio.stop_recording()
-                audio.get_queue().put("CMD_STOP")
-                send_json({"type": "status", "message": "Stopping..."})
+            # Cache sofort aktualisiert, Datei wird verzögert & atomar geschrieben.
+            # Live-Updates (Monitor-Gerät, Schwelle) laufen über den AudioEngine-Subscriber.
+            config_mgr.set(key, val)
             
-            # --- CONFIG HANDLER ---
-            elif cmd == "set_config_val":
-                try:
-                    parts = arg.strip().split(" ", 1)
-                    if len(parts) == 2:
-                        key = parts[0].strip()
-                        raw_val = parts[1].strip()
-                        
-                        val = raw_val # Fallback
-                        
-                        # Saubere Typ-Konvertierung für JSON
-                        if key in ['auto_enter_active', 'streaming_active']:
-                            val = (raw_val.lower() == "true") # -> True/False (bool)
-                        elif key in ['device_index', 'stream_pause']:
-                            val = int(float(raw_val)) # -> Int
-                        elif key in ['silence_threshold', 'auto_stop_delay']:
-                            val = float(raw_val) # -> Float
-                        
-                        config = config_mgr.load()
-                        config[key] = val
-                        config_mgr.save(config)
-                        
-                        # Feedback an UI
-                        print(json.dumps({"type": "status", "message": f"💾 Saved: {key}={val}"}))
-                        sys.stdout.flush()
-
-                        # Live-Update für Monitor wenn nötig
-                        if key == 'device_index' and audio.monitoring:
-                            audio.stop_monitoring()
-                            time.sleep(0.2)
-                            audio.start_monitoring(val)
+            # Feedback an UI
+            send_json({"type": "status", "message": f"💾 Saved: {key}={val}"})
+            return {key: val}
 
-                except Exception as e:
-                    send_json({"type": "error", "message": f"Save Error: {e}"})
-
-            elif cmd == "get_config":
-                c = config_mgr.load()
-                # Wir senden die Config explizit zurück
-                send_json({
-                    "type": "config_info", 
-                    "threshold": c.get('silence_threshold', 1.0),
-                    "device": c.get('device_index'),
-                    "auto_enter_active": c.get('auto_enter_active', False),
-                    "streaming_active": c.get('streaming_active', False),
-                    "stream_pause": c.get('stream_pause', 500),
-                    "auto_stop_delay": c.get('auto_stop_delay', 3.0)
-                })
-
-            elif cmd == "type_text" and arg:
-                sys_ctrl.write(arg)
-
-            elif cmd == "press_enter":
-                sys_ctrl.press_enter()
-
-            elif cmd == "refreshDevices" or cmd == "list_devices":
-                send_json({"type": "devices", "devices": audio.list_devices()})
-
-            elif cmd == "start_monitor":
-                if not audio.recording:
-                    audio.start_monitoring(config_mgr.load()['device_index'])
-            
-            elif cmd == "stop_monitor":
-                audio.stop_monitoring()
+        except Exception as e:
+            send_json({"type": "error", "message": f"Save Error: {e}"})
+            raise
 
-            elif cmd == "calibrate":
-                send_json({"type": "status", "message": "Calibrating..."})
-                if audio.monitoring: audio.stop_monitoring(); time.sleep(0.2)
-                config = config_mgr.load()
-                try:
-                    with audio.get_queue().mutex: audio.get_queue().queue.clear()
-                    audio.start_recording(config['device_index'], 0)
-                    time.sleep(3)
-                    audio.stop_recording()
-                    full_audio = b''
-                    q = audio.get_queue()
-                    time.sleep(0.2)
-                    while not q.empty():
-                        try: 
-                            item = q.get_nowait()
-                            if isinstance(item, bytes): full_audio += item
-                        except: pass
-                    if full_audio:
-                        rms = AudioEngine.calculate_rms(full_audio)
-                        sug = max(1.0, float(rms) * 1.5)
-                        send_json({"type": "calibration_result", "rms": float(rms), "suggestion": sug})
-                    else:
-                        send_json({"type": "error", "message": "No Audio"})
-                    send_json({"type": "ready", "message": "Done"})
-                except Exception as e:
-                    send_json({"type": "error", "message": str(e)})
+    def cmd_get_config(params):
+        c = config_mgr.load()
+        # Wir senden die Config explizit zurück
+        info = {
+            "type": "config_info", 
+            "threshold": c.get('silence_threshold', 1.0),
+            "device": c.get('device_index'),
+            "auto_enter_active": c.get('auto_enter_active', False),
+            "streaming_active": c.get('streaming_active', False),
+            "stream_pause": c.get('stream_pause', 500),
+            "auto_stop_delay": c.get('auto_stop_delay', 3.0),
+            "live_partials": c.get('live_partials', False),
+            "partial_interval_ms": c.get('partial_interval_ms', 600),
+            "output_mode": c.get('output_mode', 'keystroke')
+        }
+        send_json(info)
+        return info
+
+    def cmd_type_text(params):
+        # Tastatur-Fallback der Extension (kein Editor im Fokus) -> immer direkt tippen
+        if params.get("text"): sys_ctrl.write(params["text"])
+
+    def cmd_press_enter(params):
+        sys_ctrl.press_enter()
+
+    def cmd_list_devices(params):
+        devices = audio.list_devices()
+        send_json({"type": "devices", "devices": devices})
+        return devices
 
-            elif cmd == "quit":
-                worker_running = False
-                break
+    def cmd_start_monitor(params):
+        if not audio.recording:
+            audio.start_monitoring(config_mgr.load()['device_index'])
 
-        except KeyboardInterrupt: break
-        except Exception as e: send_json({"type": "error", "message": str(e)})
+    def cmd_stop_monitor(params):
+        audio.stop_monitoring()
+
+    def cmd_calibrate(params):
+        # Läuft im Slow-Thread des Dispatchers. Gleiches Mikrofon wie das Diktat -> start/stop werden
+        # solange abgewiesen, und die Kalibrierung nimmt eine eigene Queue (wartende Segmente bleiben)
+        calibrating.set()
+        if audio.recording:
+            calibrating.clear()
+            raise RuntimeError("Recording in progress, calibrate after stopping")
+        dictation_queue = audio.audio_queue
+        audio.audio_queue = q = queue.Queue()
+        try:
+            send_json({"type": "status", "message": "Calibrating..."})
+            if audio.monitoring: audio.stop_monitoring(); time.sleep(0.2)
+            config = config_mgr.load()
+            # Kalibrierung braucht das komplette Rauschen -> reine Energie-Schwelle 0
+            audio.start_recording(config['device_index'], 0, vad_config={"vad_mode": "rms"})
+            time.sleep(float(params.get("seconds", 3)))
+            audio.stop_recording()
+            time.sleep(0.2)
+        finally:
+            audio.audio_queue = dictation_queue
+            calibrating.clear()
+        parts = []
+        while not q.empty():
+            try: 
+                item = q.get_nowait()
+                if isinstance(item, AudioSegment) and not item.partial: parts.append(item.audio)
+            except: pass
+        result = None
+        if parts:
+            rms = AudioEngine.calculate_rms(np.concatenate(parts))
+            sug = max(1.0, float(rms) * 1.5)
+            result = {"rms": float(rms), "suggestion": sug}
+            send_json({"type": "calibration_result", **result})
+        else:
+            send_json({"type": "error", "message": "No Audio"})
+        send_json({"type": "ready", "message": "Done"})
+        return result
+
+    def cmd_autotune(params):
+        # Eigener Prozess: die Testmodelle belegen nicht zusätzlich den Speicher des Backends
+        # und torch.set_num_threads bleibt dort. Neue Settings gelten ab dem nächsten Start.
+        if not autotune_lock.acquire(blocking=False):
+            raise RuntimeError("Autotune already running")
+        try:
+            return run_autotune_process(params)
+        finally:
+            autotune_lock.release()
+
+    def run_autotune_process(params):
+        send_json({"type": "status", "message": "Autotune running (this takes a few minutes)..."})
+        args = [sys.executable, os.path.abspath(__file__), "--autotune"]
+        if params.get("precisions"): args += ["--precisions", ",".join(params["precisions"])]
+        proc = subprocess.Popen(args, stdout=subprocess.PIPE, stdin=subprocess.DEVNULL, text=True,
+                                encoding="utf-8", cwd=os.path.dirname(os.path.abspath(__file__)))
+        result = None
+        for line in proc.stdout:
+            try:
+                msg = json.loads(line)
+            except ValueError:
+                continue
+            if msg.get("type") == "autotune_result":
+                result = msg
+            send_json(msg)
+        if proc.wait() != 0 or result is None:
+            raise RuntimeError("Autotune failed")
+        config_mgr.invalidate()
+        return result
+
+    def cmd_stats(params):
+        # Rollende p50/p95/p99 pro Stufe + Speicher des Modells (bzw. des Daemons)
+        stats = {"type": "stats", **metrics.summary(), "memory": transcriber.memory_stats()}
+        send_json(stats)
+        return stats
+
+    def cmd_hello(params):
+        return {"version": PROTOCOL_VERSION, "methods": sorted(dispatcher.handlers)}
+
+    def cmd_quit(params):
+        global worker_running
+        worker_running = False
+        transcriber.cancel()
+        config_mgr.flush()
+        dispatcher.stop()
+
+    dispatcher.register("hello", cmd_hello)
+    dispatcher.register("start", cmd_start)
+    dispatcher.register("stop", cmd_stop)
+    dispatcher.register("cancel", cmd_cancel)
+    dispatcher.register("set_config_val", cmd_set_config_val, legacy=legacy_config_val)
+    dispatcher.register("get_config", cmd_get_config)
+    # Tippen dauert mit der Textlänge -> nicht im Event-Loop, sonst warten start/stop dahinter
+    dispatcher.register("type_text", cmd_type_text, slow=True, legacy=lambda arg: {"text": arg})
+    dispatcher.register("press_enter", cmd_press_enter)
+    dispatcher.register("list_devices", cmd_list_devices, slow=True)
+    dispatcher.register("refreshDevices", cmd_list_devices, slow=True)
+    dispatcher.register("start_monitor", cmd_start_monitor)
+    dispatcher.register("stop_monitor", cmd_stop_monitor)
+    dispatcher.register("calibrate", cmd_calibrate, slow=True)
+    dispatcher.register("stats", cmd_stats, slow=True)
+    dispatcher.register("autotune", cmd_autotune, background=True)
+    dispatcher.register("quit", cmd_quit)
+
+    try:
+        dispatcher.run()
+    except KeyboardInterrupt:
+        pass
 
-if __name__ == "__main__": main()
\ No newline at end of file
+if __name__ == "__main__":
+    if "--daemon" in sys.argv: run_daemon()
+    elif "--benchmark" in sys.argv: sys.exit(run_benchmark(sys.argv[1:]))
+    elif "--batch" in sys.argv: sys.exit(run_batch(sys.argv[1:]))
+    elif "--autotune" in sys.argv: sys.exit(run_autotune(sys.argv[1:]))
+    else: main()
\ No newline at end of file
@@ -0,0 +1,70 @@
+import os
+import json
+import time
+import pytest
+from core.config import ConfigManager
+
+
+@pytest.fixture
+def config_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(ConfigManager, "get_config_dir", staticmethod(lambda: tmp_path))
+    monkeypatch.setattr(ConfigManager, "MTIME_CHECK_INTERVAL", 0.0)
+    return tmp_path
+
+
+def write_file(config_dir, data):
+    path = config_dir / "config.json"
+    path.write_text(json.dumps(data), encoding="utf-8")
+    # mtime muss sich sicher ändern (grobe Dateisystem-Auflösung)
+    stamp = time.time() + 5
+    os.utime(path, (stamp, stamp))
+
+
+def read_file(config_dir):
+    return json.loads((config_dir / "config.json").read_text(encoding="utf-8"))
+
+
+def test_set_is_cached_and_flushed(config_dir):
+    mgr = ConfigManager()
+    mgr.set("silence_threshold", 9)
+    assert mgr.load()["silence_threshold"] == 9
+    mgr.flush()
+    assert read_file(config_dir)["silence_threshold"] == 9
+
+
+def test_unflushed_set_survives_foreign_write(config_dir):
+    a = ConfigManager()
+    a.set("silence_threshold", 9)
+    seen = []
+    a.subscribe(seen.append)
+    # Anderes Fenster speichert, bevor A geflusht hat
+    write_file(config_dir, {"silence_threshold": 5, "device_index": 3})
+
+    data = a.load()
+    assert data["silence_threshold"] == 9
+    assert data["device_index"] == 3
+    assert seen == [{"device_index": 3}]
+
+    a.flush()
+    assert read_file(config_dir) == {"silence_threshold": 9, "device_index": 3}
+    assert a.load()["silence_threshold"] == 9
+
+
+def test_foreign_change_is_notified(config_dir):
+    mgr = ConfigManager()
+    mgr.load()
+    seen = []
+    mgr.subscribe(seen.append)
+    write_file(config_dir, {"stream_pause": 800})
+    assert mgr.load()["stream_pause"] == 800
+    assert seen == [{"stream_pause": 800}]
+
+
+def test_coerce_uses_default_types():
+    assert ConfigManager.coerce("shared_daemon", "false") is False
+    assert ConfigManager.coerce("trim_silence", "True") is True
+    assert ConfigManager.coerce("batch_max_size", "4.0") == 4
+    assert ConfigManager.coerce("silence_threshold", "4.5") == 4.5
+    assert ConfigManager.coerce("device_index", "None") is None
+    assert ConfigManager.coerce("output_mode", "clipboard") == "clipboard"
+    assert ConfigManager.coerce("compile_model", False) is False
@@ -0,0 +1,16 @@
+from core.hallucination import HallucinationDetector
+
+
+def test_scattered_ngram_repeats_are_kept():
+    text = ("Ich öffne die Datei main.py und dann in der Funktion start rufe ich in der Funktion stop auf. "
+            "Danach in der Funktion cancel und zuletzt in der Funktion quit.")
+    assert HallucinationDetector().check(text) is None
+
+
+def test_dominant_ngram_is_dropped():
+    text = "vielen dank fürs zuschauen und vielen dank fürs zuschauen bis vielen dank fürs zuschauen ciao vielen dank fürs zuschauen"
+    assert HallucinationDetector().check(text) == "ngram"
+
+
+def test_adjacent_loop_is_dropped():
+    assert HallucinationDetector().check("Untertitel im Auftrag des ZDF " * 3) == "loop"
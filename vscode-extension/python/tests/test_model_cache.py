@@ -0,0 +1,81 @@
+import os
+import copy
+import json
+from core.model_cache import ModelCache
+
+
+def test_key_includes_revision():
+    a = ModelCache.key("org/model", "torch.float32", "cpu", "a" * 40)
+    b = ModelCache.key("org/model", "torch.float32", "cpu", "b" * 40)
+    assert a != b
+    assert a == "org--model-aaaaaaaaaaaa-float32-cpu"
+
+
+def test_sweep_removes_tmp_of_dead_process(tmp_path):
+    cache = ModelCache(tmp_path)
+    done = tmp_path / ModelCache.key("org/model", "torch.float32", "cpu", "a" * 40)
+    done.mkdir()
+    dead = tmp_path / (done.name + ".tmp999999999")
+    dead.mkdir()
+    alive = tmp_path / (done.name + f".tmp{os.getppid()}")
+    alive.mkdir()
+    cache.sweep()
+    assert done.exists()
+    assert not dead.exists()
+    assert alive.exists()
+
+
+def test_old_revisions_are_removed(tmp_path):
+    cache = ModelCache(tmp_path)
+    old = tmp_path / ModelCache.key("org/model", "torch.float32", "cpu", "a" * 40)
+    legacy = tmp_path / "org--model-float32-cpu"
+    other_dtype = tmp_path / ModelCache.key("org/model", "torch.bfloat16", "cpu", "a" * 40)
+    other_model = tmp_path / ModelCache.key("org/model-v2", "torch.float32", "cpu", "a" * 40)
+    for d in (old, legacy, other_dtype, other_model):
+        d.mkdir()
+    cache._remove_old_revisions("org/model", "torch.float32", "cpu", "b" * 40)
+    assert not old.exists() and not legacy.exists()
+    assert other_dtype.exists() and other_model.exists()
+
+
+def test_source_matches_safetensors_in_target_dtype(tmp_path):
+    (tmp_path / "config.json").write_text('{"torch_dtype": "float32"}', encoding="utf-8")
+    assert not ModelCache.source_matches(str(tmp_path), "torch.float32")
+    (tmp_path / "model.safetensors").write_bytes(b"")
+    assert ModelCache.source_matches(str(tmp_path), "torch.float32")
+    assert not ModelCache.source_matches(str(tmp_path), "torch.float16")
+
+
+class _GenerationConfig:
+    def __init__(self, cache_implementation=None):
+        self.cache_implementation = cache_implementation
+
+    def save_pretrained(self, path):
+        (path / "generation_config.json").write_text(json.dumps({"cache_implementation": self.cache_implementation}))
+
+
+class _Model:
+    def __init__(self):
+        self.generation_config = _GenerationConfig()
+
+    def save_pretrained(self, path, safe_serialization=True):
+        (path / "model.safetensors").write_bytes(b"")
+        self.generation_config.save_pretrained(path)
+
+
+class _Pipe:
+    def __init__(self):
+        self.model = _Model()
+        self.tokenizer = None
+        self.feature_extractor = None
+
+
+def test_store_keeps_generation_config_from_load_time(tmp_path):
+    cache = ModelCache(tmp_path)
+    pipe = _Pipe()
+    generation_config = copy.deepcopy(pipe.model.generation_config)
+    pipe.model.generation_config.cache_implementation = "static"  # compile_model während des Schreibens
+    parts = (pipe.model, None, None, generation_config)
+    assert cache.store(parts, "org/model", "torch.float16", "cpu", "a" * 40)
+    saved = cache.path("org/model", "torch.float16", "cpu", "a" * 40) / "generation_config.json"
+    assert json.loads(saved.read_text())["cache_implementation"] is None
@@ -0,0 +1,78 @@
+import time
+import pytest
+from core import output
+from core.output import ClipboardSink, OutputRouter
+
+
+class FakeClipboard:
+    def __init__(self, content):
+        self.content = content
+
+    def copy(self, text):
+        self.content = text
+        return True
+
+    def paste(self):
+        return self.content
+
+
+class FakeGui:
+    def __init__(self):
+        self.hotkeys = []
+
+    def hotkey(self, *keys):
+        self.hotkeys.append(keys)
+
+
+@pytest.fixture
+def sink(monkeypatch):
+    gui = FakeGui()
+    clip = FakeClipboard("vorher")
+    monkeypatch.setattr(output, "PYAUTOGUI_AVAILABLE", True)
+    monkeypatch.setattr(output, "pyautogui", gui, raising=False)
+    monkeypatch.setattr(ClipboardSink, "RESTORE_DELAY", 0.05)
+    s = ClipboardSink(sys_ctrl=None)
+    monkeypatch.setattr(s, "_copy", clip.copy)
+    monkeypatch.setattr(s, "_paste", clip.paste)
+    return s, clip, gui
+
+
+def wait_restore(s):
+    for _ in range(100):
+        if s._restore_timer is None:
+            return
+        time.sleep(0.01)
+
+
+def test_hotkey_default_and_configured(sink):
+    s, _, _ = sink
+    s.os_name = "Linux"
+    assert s.hotkey_keys() == ["ctrl", "v"]
+    s.paste_hotkey = "Ctrl + Shift + V"
+    assert s.hotkey_keys() == ["ctrl", "shift", "v"]
+
+
+def test_restores_previous_clipboard(sink):
+    s, clip, gui = sink
+    s.write("hallo")
+    s.write("welt")
+    assert clip.content == "welt"
+    assert len(gui.hotkeys) == 2
+    wait_restore(s)
+    # Das Original der ersten Einfügung, nicht der eigene Zwischentext
+    assert clip.content == "vorher"
+
+
+def test_keeps_clipboard_copied_in_between(sink):
+    s, clip, _ = sink
+    s.write("hallo")
+    clip.content = "vom benutzer"
+    wait_restore(s)
+    assert clip.content == "vom benutzer"
+
+
+def test_router_passes_paste_hotkey():
+    router = OutputRouter(sys_ctrl=None, mode="clipboard", paste_hotkey="ctrl+shift+v")
+    assert router.sink.paste_hotkey == "ctrl+shift+v"
+    router.on_config_changed({"paste_hotkey": "ctrl+v"})
+    assert router.sink.hotkey_keys() == ["ctrl", "v"]
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+from core.ringbuffer import AudioRingBuffer
+
+
+def chunk(value, n):
+    return np.full(n, value, dtype=np.int16)
+
+
+def test_cut_returns_readonly_view_in_order():
+    buf = AudioRingBuffer(100)
+    buf.append(chunk(1, 10))
+    buf.append(chunk(2, 10))
+    first = buf.cut(10)
+    assert (first == 1).all()
+    assert not first.flags.writeable
+    assert len(buf) == 10
+    assert (buf.cut() == 2).all()
+    assert len(buf) == 0
+
+
+def test_queued_segment_survives_clear_and_next_recording():
+    buf = AudioRingBuffer(100)
+    buf.append(chunk(1000, 30))
+    queued = buf.cut()
+    buf.clear()  # neue Aufnahme (configure_recording / stop_recording)
+    buf.append(chunk(-7, 30))
+    assert (queued == 1000).all()
+    assert (buf.cut() == -7).all()
+
+
+def test_queued_segment_survives_wrap():
+    buf = AudioRingBuffer(50)
+    buf.append(chunk(5, 40))
+    queued = buf.cut(30)
+    buf.clear()
+    buf.append(chunk(9, 40))  # passt nicht mehr -> neuer Block
+    assert (queued == 5).all()
+    assert (buf.cut() == 9).all()
+
+
+def test_keep_last_and_overflow():
+    buf = AudioRingBuffer(50)
+    buf.append(np.arange(20, dtype=np.int16))
+    buf.keep_last(5)
+    assert list(buf.peek()) == [15, 16, 17, 18, 19]
+    with pytest.raises(OverflowError):
+        buf.append(chunk(0, 50))
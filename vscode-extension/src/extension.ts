@@ -10,6 +10,7 @@ let backend: PythonBackendManager;
 let statusBar: StatusBarManager;
 let outputChannel: vscode.OutputChannel;
 let extensionContext: vscode.ExtensionContext | undefined;
+let insertQueue: Promise<void> = Promise.resolve();
 
 export async function activate(context: vscode.ExtensionContext) {
     extensionContext = context;
@@ -42,6 +43,10 @@ function registerCommands(context: vscode.ExtensionContext) {
             statusBar.setProcessing();
         }),
 
+        vscode.commands.registerCommand('alpencode.cancel', () => {
+            backend.send('cancel');
+        }),
+
         vscode.commands.registerCommand('alpencode.toggle', () => {
             if (statusBar.text.includes("Recording")) {
                 vscode.commands.executeCommand('alpencode.stop');
@@ -61,8 +66,35 @@ function registerCommands(context: vscode.ExtensionContext) {
                 title: "🎤 Calibrating... Please stay silent.",
                 cancellable: false
             }, async (progress) => {
-                backend.send('calibrate');
-                await new Promise(resolve => setTimeout(resolve, 4000));
+                // Wartet auf die Antwort des Backends statt auf ein festes Timeout
+                await backend.request('calibrate').catch(e => outputChannel.appendLine(`Calibrate failed: ${e}`));
+            });
+        }),
+
+        vscode.commands.registerCommand('alpencode.stats', async () => {
+            // Rollende Latenzen pro Pipeline-Stufe + Modellspeicher im Output-Kanal anzeigen
+            try {
+                const stats = await backend.request('stats');
+                outputChannel.appendLine(`Stats: ${JSON.stringify(stats, null, 2)}`);
+                outputChannel.show();
+            } catch (e) {
+                outputChannel.appendLine(`Stats failed: ${e}`);
+            }
+        }),
+
+        vscode.commands.registerCommand('alpencode.autotune', () => {
+            vscode.window.withProgress({
+                location: vscode.ProgressLocation.Notification,
+                title: "⚙️ AlpenCode: Tuning inference settings (a few minutes)...",
+                cancellable: false
+            }, async () => {
+                try {
+                    const result = await backend.request('autotune', {}, 60 * 60 * 1000);
+                    outputChannel.appendLine(`Autotune: ${JSON.stringify(result, null, 2)}`);
+                    vscode.window.showInformationMessage(`AlpenCode autotune: ${JSON.stringify(result.settings)} (applies after restart)`);
+                } catch (e) {
+                    outputChannel.appendLine(`Autotune failed: ${e}`);
+                }
             });
         }),
 
@@ -189,9 +221,20 @@ function handleBackendMessage(msg: any) {
             outputChannel.appendLine(`Status: ${msg.message}`);
             break;
 
+        case 'metrics':
+            outputChannel.appendLine(`Metrics: total ${msg.stages.total} ms (queue ${msg.stages.queue_wait}, inference ${msg.stages.inference ?? '-'}, write ${msg.stages.write}) for ${msg.audio_ms} ms audio`);
+            break;
+
+        case 'partial':
+            // Live-Hypothese anzeigen, getippt wird nur das stabile Präfix (Backend)
+            statusBar.setPartial(msg.text);
+            break;
+
         case 'transcription':
-            insertText(msg.text);
-            statusBar.setReady();
+            // Reihenfolge einhalten: jede Einfügung wartet auf die vorherige
+            insertQueue = insertQueue
+                .then(() => insertText(msg.text || '', !!msg.enter))
+                .catch(e => outputChannel.appendLine(`Insert failed: ${e}`));
             break;
 
         case 'error':
@@ -265,21 +308,35 @@ function handleBackendMessage(msg: any) {
     }
 }
 
-function insertText(text: string) {
+async function insertText(text: string, pressEnter = false) {
     const config = vscode.workspace.getConfiguration('alpencode');
-    const autoEnter = config.get<boolean>('autoEnter', false);
+    const autoEnter = config.get<boolean>('autoEnter', false) && text.length > 0;
+    const enter = pressEnter || autoEnter;
 
-    if (text && text.length > 0) {
-
-        const textToType = text + (autoEnter ? "" : " ");
-        backend.send(`type_text ${textToType}`);
-
-        if (autoEnter) {
-            setTimeout(() => {
-                backend.send('press_enter');
-            }, 100);
+    // Editor im Fokus: ein einziges Edit, unabhängig von der Textlänge und ohne Tastatur-Kollisionen
+    const editor = vscode.window.activeTextEditor;
+    if (editor && vscode.window.state.focused && text.length > 0) {
+        const ok = await editor.edit(edit => {
+            for (const selection of editor.selections) {
+                edit.replace(selection, text);
+            }
+        });
+        if (ok) {
+            // Enter als echter Tastendruck nach dem Edit, nie als "\n" im Dokument
+            if (enter) {
+                await backend.request('press_enter').catch(e => outputChannel.appendLine(`Enter failed: ${e}`));
+            }
+            return;
         }
     }
+
+    // Fallback (Terminal, Chat, andere Apps): Backend tippt
+    if (text.length > 0) {
+        await backend.request('type_text', { text }, 120000).catch(e => outputChannel.appendLine(`Typing failed: ${e}`));
+    }
+    if (enter) {
+        backend.send('press_enter');
+    }
 }
 
 
@@ -7,6 +7,8 @@ export class PythonBackendManager {
     private outputChannel: vscode.OutputChannel;
     private onMessageCallback: (msg: any) => void;
     private intentionalStop: boolean = false; // <--- NEU: Flag für gewollten Stopp
+    private nextRequestId: number = 1;
+    private pending = new Map<number, { resolve: (result: any) => void, reject: (err: Error) => void, timer: NodeJS.Timeout }>();
 
     constructor(outputChannel: vscode.OutputChannel, onMessage: (msg: any) => void) {
         this.outputChannel = outputChannel;
@@ -18,10 +20,13 @@ export class PythonBackendManager {
         const scriptPath = path.join(extensionPath, 'python', 'main.py');
         this.outputChannel.appendLine(`Starting Backend: ${pythonPath} ${scriptPath}`);
 
+        // Erster Workspace-Ordner: dort sucht das Backend .alpencode/vocabulary.json
+        const workspace = vscode.workspace.workspaceFolders?.[0]?.uri.fsPath ?? '';
         const env = { 
             ...process.env, 
             PYTHONUNBUFFERED: '1',
-            PYTHONIOENCODING: 'utf-8' 
+            PYTHONIOENCODING: 'utf-8',
+            ALPENCODE_WORKSPACE: workspace
         };
         
         try {
@@ -38,6 +43,10 @@ export class PythonBackendManager {
                         if (!line.trim()) continue;
                         try {
                             const msg = JSON.parse(line);
+                            if (msg.type === 'response') {
+                                this.resolveRequest(msg);
+                                continue;
+                            }
                             this.onMessageCallback(msg);
                         } catch (e) {
                             // ignore partial JSON
@@ -61,6 +70,8 @@ export class PythonBackendManager {
                 }
 
                 this.outputChannel.appendLine(`Python backend exited with code ${code}`);
+                this.pending.forEach(entry => { clearTimeout(entry.timer); entry.reject(new Error('Backend exited')); });
+                this.pending.clear();
                 try {
                     this.onMessageCallback({ type: 'backend_exited', code });
                 } catch (e) { }
@@ -92,6 +103,36 @@ export class PythonBackendManager {
         }
     }
 
+    // Framed Request mit ID (Protokoll v1), die Antwort kommt als {"type": "response", "id": ...}
+    // Ohne Antwort nach timeoutMs wird abgelehnt, damit Fortschrittsanzeigen nie hängen bleiben
+    public request(method: string, params: any = {}, timeoutMs: number = 30000): Promise<any> {
+        if (!this.isRunning()) {
+            return Promise.reject(new Error('Backend not running'));
+        }
+        const id = this.nextRequestId++;
+        return new Promise((resolve, reject) => {
+            const timer = setTimeout(() => {
+                if (this.pending.delete(id)) {
+                    reject(new Error(`Request '${method}' timed out after ${timeoutMs} ms`));
+                }
+            }, timeoutMs);
+            this.pending.set(id, { resolve, reject, timer });
+            this.send(JSON.stringify({ v: 1, id, method, params }));
+        });
+    }
+
+    private resolveRequest(msg: any) {
+        const entry = this.pending.get(msg.id);
+        if (!entry) return;
+        this.pending.delete(msg.id);
+        clearTimeout(entry.timer);
+        if (msg.error !== undefined) {
+            entry.reject(new Error(msg.error));
+        } else {
+            entry.resolve(msg.result);
+        }
+    }
+
     public isRunning(): boolean {
         return this.process !== undefined && !this.process.killed;
     }
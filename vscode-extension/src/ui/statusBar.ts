@@ -21,6 +21,12 @@ export class StatusBarManager {
         this.item.backgroundColor = new vscode.ThemeColor('statusBarItem.errorBackground');
     }
 
+    public setPartial(text: string) {
+        const snippet = text.length > 40 ? '…' + text.slice(-40) : text;
+        this.item.text = `$(record) Recording... ${snippet}`;
+        this.item.tooltip = text;
+    }
+
     public setProcessing() {
         this.item.text = "$(sync~spin) Processing...";
         this.item.backgroundColor = undefined;